@@ -0,0 +1,250 @@
+import asyncio
+import collections
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+
+from .resource_policy import TYPE_EXTENSIONS, extension_pattern
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+CACHEABLE_TYPES = ("stylesheet", "script", "font", "image")
+# Headers describing the transfer rather than the asset itself
+SKIPPED_HEADERS = ("content-encoding", "content-length", "transfer-encoding", "connection", "set-cookie")
+
+
+@dataclasses.dataclass
+class CachedAsset:
+    url: str
+    etag: str
+    status: int
+    headers: dict
+    size: int
+    expires_at: float  # time.time() after which the asset is revalidated
+
+
+class AssetCache:
+    """
+    Disk-backed cache of static assets shared by every context.
+
+    Browser contexts don't share their HTTP cache, so each session downloads
+    the same stylesheets, scripts and fonts again through its proxy. The cache
+    answers those requests from disk instead. Entries are keyed by URL and
+    ETag: a fresh entry is served without any request, a stale one is
+    revalidated with If-None-Match and only downloaded again when it changed.
+    The least recently used entries are evicted beyond `max_bytes`.
+
+    Usage:
+        cache = AssetCache(".asset_cache")
+        await api.create_sessions(num_sessions=5, starting_url=BASE_URL, asset_cache=cache)
+        print(cache.stats())
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * MB,
+        resource_types: tuple = CACHEABLE_TYPES,
+        default_ttl: float = 24 * 3600,
+    ):
+        """
+        Create an AssetCache, loading the entries already on disk.
+
+        Args:
+            directory (str): The directory holding the cached assets, can be shared between runs.
+            max_bytes (int): The maximum total size of the cached bodies.
+            resource_types (tuple): The resource types to cache, each needs an entry in TYPE_EXTENSIONS.
+            default_ttl (float): The seconds an asset without Cache-Control max-age stays fresh.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.resource_types = frozenset(resource_types)
+        self.default_ttl = default_ttl
+        self.pattern = extension_pattern([e for t in resource_types for e in TYPE_EXTENSIONS[t]])
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bytes_served = 0
+        self.size = 0
+        self._entries = collections.OrderedDict()  # url -> CachedAsset, least recently used first
+        self._fetching = {}  # digest -> [asyncio.Lock, callers holding or waiting for it]
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def _digest(url: str) -> str:
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _path(self, url: str, suffix: str) -> str:
+        return os.path.join(self.directory, self._digest(url) + suffix)
+
+    def _load(self):
+        metas = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path) as f:
+                    metas.append((os.path.getmtime(path), CachedAsset(**json.load(f))))
+            except (OSError, ValueError, TypeError):
+                continue
+        for _, asset in sorted(metas, key=lambda meta: meta[0]):
+            self._entries[asset.url] = asset
+            self.size += asset.size
+        self._evict()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "bytes_served": self.bytes_served,
+            "entries": len(self._entries),
+            "size": self.size,
+        }
+
+    def _ttl(self, headers: dict) -> float:
+        cache_control = headers.get("cache-control", "")
+        match = re.search(r"max-age=(\d+)", cache_control)
+        return int(match.group(1)) if match else self.default_ttl
+
+    @staticmethod
+    def _storable(status: int, headers: dict) -> bool:
+        cache_control = headers.get("cache-control", "")
+        return status == 200 and "no-store" not in cache_control and "private" not in cache_control
+
+    def _write(self, asset: CachedAsset, body: bytes):
+        for suffix, data in ((".body", body), (".json", json.dumps(dataclasses.asdict(asset)).encode("utf-8"))):
+            # a temporary file per write, so concurrent writers (e.g. other processes) never share one
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, self._path(asset.url, suffix))
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+
+    def _read(self, url: str) -> bytes:
+        with open(self._path(url, ".body"), "rb") as f:
+            return f.read()
+
+    def _remove(self, url: str):
+        asset = self._entries.pop(url, None)
+        if asset is None:
+            return
+        self.size -= asset.size
+        for suffix in (".body", ".json"):
+            try:
+                os.remove(self._path(url, suffix))
+            except OSError:
+                pass
+
+    def _evict(self):
+        while self.size > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+
+    async def _store(self, url: str, status: int, headers: dict, body: bytes):
+        if not self._storable(status, headers) or len(body) > self.max_bytes // 10:
+            return
+        asset = CachedAsset(url, headers.get("etag"), status, headers, len(body), time.time() + self._ttl(headers))
+        await asyncio.to_thread(self._write, asset, body)
+        # the files of a previous version were just overwritten, only its size is left to account for
+        previous = self._entries.pop(url, None)
+        if previous is not None:
+            self.size -= previous.size
+        self._entries[url] = asset
+        self.size += asset.size
+        self._evict()
+
+    async def _serve(self, route, asset: CachedAsset) -> bool:
+        try:
+            body = await asyncio.to_thread(self._read, asset.url)
+        except OSError:
+            self._remove(asset.url)
+            return False
+        self._entries.move_to_end(asset.url)
+        self.bytes_served += len(body)
+        await route.fulfill(status=asset.status, headers=asset.headers, body=body)
+        return True
+
+    async def handle(self, route, request):
+        """Route handler answering cacheable GETs from the cache"""
+        if request.method != "GET" or request.resource_type not in self.resource_types:
+            await route.fallback()
+            return
+        url = request.url
+        if await self._serve_fresh(route, url):
+            return
+
+        # one fetch per url at a time, sessions warming the same page wait for the first download
+        digest = self._digest(url)
+        fetching = self._fetching.setdefault(digest, [asyncio.Lock(), 0])
+        fetching[1] += 1
+        try:
+            async with fetching[0]:
+                if not await self._serve_fresh(route, url):
+                    await self._fetch(route, request)
+        finally:
+            fetching[1] -= 1
+            if fetching[1] == 0:
+                del self._fetching[digest]
+
+    async def _serve_fresh(self, route, url: str) -> bool:
+        asset = self._entries.get(url)
+        if asset is None or asset.expires_at <= time.time():
+            return False
+        if await self._serve(route, asset):
+            self.hits += 1
+            return True
+        return False
+
+    async def _fetch(self, route, request):
+        url = request.url
+        asset = self._entries.get(url)
+        headers = dict(request.headers)
+        if asset is not None and asset.etag:
+            headers["if-none-match"] = asset.etag
+        try:
+            response = await route.fetch(headers=headers)
+            if response.status == 304 and asset is not None:
+                self.revalidated += 1
+                asset.expires_at = time.time() + self._ttl(response.headers)
+                if await self._serve(route, asset):
+                    self.hits += 1
+                    return
+                response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            # let the browser load the asset itself rather than leave the request hanging
+            logger.warning(f"Failed to fetch {url} for the asset cache: {e}")
+            await route.fallback()
+            return
+
+        self.misses += 1
+        # the body is already decoded, so drop the headers describing the transfer
+        headers = {k: v for k, v in response.headers.items() if k.lower() not in SKIPPED_HEADERS}
+        try:
+            await self._store(url, response.status, headers, body)
+        except Exception as e:
+            logger.warning(f"Failed to cache {url}: {e}")
+        await route.fulfill(status=response.status, headers=headers, body=body)
+
+    async def apply(self, target):
+        """
+        Register the cache on a context or page.
+
+        Args:
+            target (BrowserContext | Page): Where to register the route, a context covers all of its pages.
+        """
+        await target.route(self.pattern, self.handle)
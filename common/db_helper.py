@@ -1,25 +1,322 @@
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from dataclasses import dataclass
+import asyncio
+import atexit
+import collections
+import functools
+import os
+import sys
+import threading
+import time
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, InterfaceError, OperationalError
 import logging
+
+
+class PoolTimeoutError(Exception):
+    """No connection became available in the pool before the borrow timeout."""
+
+
+@dataclass
+class PoolStats:
+    """Snapshot of a ConnectionPool's counters, for monitoring."""
+
+    size: int
+    idle: int
+    in_use: int
+    created: int
+    recycled: int
+    borrows: int
+    borrow_wait_total: float
+    borrow_wait_max: float
+    statement_hits: int = 0
+    statement_misses: int = 0
+
+    @property
+    def borrow_wait_avg(self):
+        return self.borrow_wait_total / self.borrows if self.borrows else 0.0
+
+
+class StatementCache:
+    """
+    LRU of server-side prepared cursors for a single connection.
+
+    mysql-connector only reuses a prepared statement when a cursor is executed
+    again with the very same query object (an identity check) and sequence
+    params; an equal but distinct string or dict params prepare it anew. Keys
+    are interned, so callers passing an equal string get the statement back.
+    """
+
+    def __init__(self, connection, size=64):
+        """
+        :param connection: Connection the statements are prepared on
+        :param size: Maximum number of prepared statements kept open
+        """
+        self.connection = connection
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._cursors = collections.OrderedDict()
+
+    def cursor(self, query):
+        """
+        :param query: SQL query with %s placeholders, execute the cursor with the interned string sys.intern(query)
+        :return: Prepared cursor for the query, reused when cached
+        """
+        query = sys.intern(query)
+        cursor = self._cursors.get(query)
+        if cursor is not None:
+            self._cursors.move_to_end(query)
+            self.hits += 1
+            return cursor
+        self.misses += 1
+        cursor = self.connection.cursor(prepared=True)
+        self._cursors[query] = cursor
+        if len(self._cursors) > self.size:
+            _, evicted = self._cursors.popitem(last=False)
+            self._close_cursor(evicted)
+        return cursor
+
+    def discard(self, query):
+        """
+        Drop the cursor for a query, e.g. after it failed mid-execution.
+        """
+        cursor = self._cursors.pop(sys.intern(query), None)
+        if cursor is not None:
+            self._close_cursor(cursor)
+
+    def clear(self):
+        """
+        Close every cached cursor, deallocating the statements on the server.
+        """
+        while self._cursors:
+            _, cursor = self._cursors.popitem()
+            self._close_cursor(cursor)
+
+    @staticmethod
+    def _close_cursor(cursor):
+        try:
+            cursor.close()
+        except Error:
+            pass
+
+
+class ConnectionPool:
+    """
+    Bounded, thread-safe pool of MySQL connections.
+
+    Connections are created lazily up to `size`, handed out LIFO so the warmest
+    connection is reused first, closed once they have been idle for longer than
+    `idle_timeout` and pinged on borrow when they have not been used for
+    `health_check_after` seconds. Stale connections are replaced transparently.
+    Every connection carries its own StatementCache of prepared statements.
+    """
+
+    def __init__(self, connect, size=5, idle_timeout=300, borrow_timeout=30, health_check_after=5,
+                 statement_cache_size=64):
+        """
+        :param connect: Callable returning a new MySQL connection
+        :param size: Maximum number of open connections
+        :param idle_timeout: Seconds after which an idle connection is closed instead of reused
+        :param borrow_timeout: Seconds to wait for a free connection before raising PoolTimeoutError
+        :param health_check_after: Idle seconds after which a connection is pinged before being handed out
+        :param statement_cache_size: Prepared statements kept per connection
+        """
+        self._connect = connect
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.borrow_timeout = borrow_timeout
+        self.health_check_after = health_check_after
+        self.statement_cache_size = statement_cache_size
+
+        self._cond = threading.Condition()
+        self._idle = collections.deque()  # (connection, last_used)
+        self._open = 0
+        self._created = 0
+        self._recycled = 0
+        self._borrows = 0
+        self._borrow_wait_total = 0.0
+        self._borrow_wait_max = 0.0
+        self._statements = {}  # id(connection) -> StatementCache
+        self._statement_hits = 0
+        self._statement_misses = 0
+
+    def borrow(self):
+        """
+        Take a healthy connection out of the pool, creating one if there is room.
+        Blocks up to `borrow_timeout` seconds when every connection is in use.
+        """
+        start = time.monotonic()
+        deadline = start + self.borrow_timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    connection, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    self._open += 1
+                    connection, last_used = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(f"No database connection available after {self.borrow_timeout}s")
+                self._cond.wait(remaining)
+            waited = time.monotonic() - start
+            self._borrows += 1
+            self._borrow_wait_total += waited
+            self._borrow_wait_max = max(self._borrow_wait_max, waited)
+
+        try:
+            if connection is None:
+                return self._create()
+            idle_for = time.monotonic() - last_used
+            if idle_for > self.idle_timeout or (idle_for > self.health_check_after and not self._is_alive(connection)):
+                self._close_quietly(connection)
+                with self._cond:
+                    self._recycled += 1
+                return self._create()
+            return connection
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, connection, broken=False):
+        """
+        Return a borrowed connection to the pool.
+        :param connection: Connection previously obtained from borrow()
+        :param broken: Close the connection instead of reusing it
+        """
+        if broken:
+            self._close_quietly(connection)
+        with self._cond:
+            if broken:
+                self._open -= 1
+                self._recycled += 1
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def statements(self, connection):
+        """
+        :param connection: A borrowed connection
+        :return: The StatementCache of that connection
+        """
+        with self._cond:
+            cache = self._statements.get(id(connection))
+            if cache is None:
+                cache = self._statements[id(connection)] = StatementCache(connection, self.statement_cache_size)
+            return cache
+
+    def stats(self):
+        """
+        :return: PoolStats with the current counters
+        """
+        with self._cond:
+            caches = list(self._statements.values())
+            return PoolStats(
+                size=self.size,
+                idle=len(self._idle),
+                in_use=self._open - len(self._idle),
+                created=self._created,
+                recycled=self._recycled,
+                borrows=self._borrows,
+                borrow_wait_total=self._borrow_wait_total,
+                borrow_wait_max=self._borrow_wait_max,
+                statement_hits=self._statement_hits + sum(cache.hits for cache in caches),
+                statement_misses=self._statement_misses + sum(cache.misses for cache in caches),
+            )
+
+    def close(self):
+        """
+        Close every idle connection. Borrowed connections are closed when released as broken.
+        """
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._open -= len(idle)
+        for connection, _ in idle:
+            self._close_quietly(connection)
+
+    def _create(self):
+        connection = self._connect()
+        with self._cond:
+            self._created += 1
+        return connection
+
+    @staticmethod
+    def _is_alive(connection):
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except Error:
+            return False
+
+    def _close_quietly(self, connection):
+        with self._cond:
+            cache = self._statements.pop(id(connection), None)
+            if cache is not None:
+                self._statement_hits += cache.hits
+                self._statement_misses += cache.misses
+        if cache is not None:
+            cache.clear()
+        try:
+            connection.close()
+        except Error:
+            pass
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_shared_pool(key, connect, **pool_options):
+    """
+    Return the process-wide pool registered under `key`, creating it on first use.
+    The pid is part of the key so forked workers never share sockets with their parent,
+    and so are the pool options, so a helper asking for e.g. a larger pool gets its own.
+    """
+    key = (os.getpid(), *key, *sorted(pool_options.items()))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(connect, **pool_options)
+        return pool
+
+
 class DatabaseHelper:
-    def __init__(self, host, port, user, password, database):
+    def __init__(self, host, port, user, password, database, pool_size=5, idle_timeout=300, borrow_timeout=30,
+                 statement_cache_size=64):
         """
         Initialize the MySQLHelper class with database connection details.
+        Helpers created with the same host/port/user/database and pool options share one connection pool per process.
+        :param pool_size: Maximum number of pooled connections
+        :param idle_timeout: Seconds after which an idle pooled connection is recycled
+        :param borrow_timeout: Seconds to wait for a free pooled connection
+        :param statement_cache_size: Prepared statements kept per pooled connection
         """
         self.host = host
         self.port = port
         self.user = user
         self.password = password
         self.database = database
-        self.connection = self._connect()
+        self.pool = get_shared_pool(
+            (host, str(port), user, database),
+            self._connect,
+            size=pool_size,
+            idle_timeout=idle_timeout,
+            borrow_timeout=borrow_timeout,
+            statement_cache_size=statement_cache_size,
+        )
 
     def _connect(self):
         """
         Establish a connection to the MySQL database.
         """
         try:
-            self.connection = mysql.connector.connect(
+            return mysql.connector.connect(
                 host=self.host,
                 port=self.port,
                 user=self.user,
@@ -28,46 +325,136 @@ class DatabaseHelper:
             )
         except Error as e:
             print(f"Error connecting to MySQL: {e}")
-            return None
+            raise
+
+    def stats(self):
+        """
+        Pool statistics (borrow wait time, in-use, created, recycled) for monitoring.
+        :return: PoolStats
+        """
+        return self.pool.stats()
 
     @contextmanager
-    def managed_cursor(self):
+    def managed_connection(self):
         """
-        Context manager to provide a managed MySQL cursor.
+        Context manager to provide a pooled MySQL connection, committed on success
+        and rolled back on error.
         Yields:
-            cursor: A MySQL cursor.
+            connection: A MySQL connection.
         """
-        self._connect()
-        cursor = self.connection.cursor()
+        connection = self.pool.borrow()
+        broken = False
         try:
-            yield cursor
-            self.connection.commit()
+            yield connection
+            connection.commit()
         except Error as e:
-            self.connection.rollback()
+            try:
+                connection.rollback()
+            except Error:
+                broken = True
             print(f"Error during cursor operation: {e}")
             raise e
+        except BaseException:
+            try:
+                connection.rollback()
+            except Error:
+                broken = True
+            raise
         finally:
-            cursor.close()
+            self.pool.release(connection, broken=broken)
+
+    @contextmanager
+    def managed_cursor(self):
+        """
+        Context manager to provide a managed MySQL cursor on a pooled connection.
+        Yields:
+            cursor: A MySQL cursor.
+        """
+        with self.managed_connection() as connection:
+            cursor = connection.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+
+    @contextmanager
+    def prepared_cursor(self, query):
+        """
+        Context manager to provide a cached server-side prepared cursor for `query`
+        on a pooled connection. Execute it with sys.intern(query) and tuple or list
+        params, anything else prepares the statement again.
+        Yields:
+            cursor: A prepared MySQL cursor.
+        """
+        with self.managed_connection() as connection:
+            statements = self.pool.statements(connection)
+            cursor = statements.cursor(query)
+            try:
+                yield cursor
+            except BaseException:
+                statements.discard(query)
+                raise
 
-    def execute(self, query):
+    def execute(self, query, params=None, prepared=False):
         """
         Execute a query (INSERT, UPDATE, DELETE).
-        :param query: SQL query to execute
+        :param query: SQL query to execute, with %s placeholders for params
         :param params: Parameters for the query
+        :param prepared: Run the query as a server-side prepared statement cached per connection.
+                         Only worth it for fixed statements executed many times with tuple or list params;
+                         dynamic SQL would fill the cache with statements that are never reused.
         :return: True if the query was successful, else False
         """
         try:
-            with self.managed_cursor() as cursor:
-                cursor.execute(query)
+            if prepared and params is not None and not isinstance(params, dict):
+                # the connector reuses the statement only when given the interned string it was prepared with
+                query = sys.intern(query)
+                cursor_context = self.prepared_cursor(query)
+            else:
+                cursor_context = self.managed_cursor()
+            with cursor_context as cursor:
+                cursor.execute(query, params)
                 print(query)
-                result = cursor.fetchall()
+                result = cursor.fetchall() if cursor.with_rows else []
                 return result
         except Exception as e:
             logging.debug(f'Error execute query in Database: {query}')
             logging.error(e)
             raise e
         return -1
-    
+
+    def iterate(self, query, params=None, batch_size=1000):
+        """
+        Stream the rows of a SELECT in batches through an unbuffered cursor, so
+        memory stays flat regardless of the result size. The connection is held
+        until the generator is exhausted or closed; consume it promptly, the server
+        aborts the result if the client stops reading for longer than net_write_timeout.
+        :param query: SQL query to execute
+        :param params: Parameters for the query
+        :param batch_size: Rows fetched per batch
+        :return: Generator of lists of rows
+        """
+        connection = self.pool.borrow()
+        exhausted = False
+        try:
+            cursor = connection.cursor()
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+            cursor.close()
+            connection.commit()
+            exhausted = True
+        except Exception as e:
+            logging.debug(f'Error iterate query in Database: {query}')
+            logging.error(e)
+            raise e
+        finally:
+            # An abandoned stream leaves unread rows on the wire; drop the connection rather than drain it.
+            self.pool.release(connection, broken=not exhausted)
+
     def executemany(self, query, values):
         """
         Execute a query (INSERT, UPDATE, DELETE).
@@ -79,10 +466,274 @@ class DatabaseHelper:
             with self.managed_cursor() as cursor:
                 cursor.executemany(query, values)
                 print(query)
-                result = cursor.fetchall()
+                result = cursor.fetchall() if cursor.with_rows else []
                 return result
         except Exception as e:
             logging.debug(f'Error executemany query in Database: {query}')
             logging.error(e)
             raise e
-        return -1
\ No newline at end of file
+        return -1
+
+
+class AsyncDatabaseHelper:
+    """
+    Awaitable sibling of DatabaseHelper for asyncio crawlers.
+
+    Queries run on a dedicated thread pool sized to the connection pool, so DB
+    round-trips overlap with network fetches instead of blocking the event loop.
+    """
+
+    def __init__(self, host, port, user, password, database, pool_size=5, idle_timeout=300, borrow_timeout=30,
+                 statement_cache_size=64):
+        """
+        Initialize the AsyncDatabaseHelper class with database connection details.
+        Accepts the same pool options as DatabaseHelper.
+        """
+        self.db = DatabaseHelper(
+            host=host,
+            port=port,
+            user=user,
+            password=password,
+            database=database,
+            pool_size=pool_size,
+            idle_timeout=idle_timeout,
+            borrow_timeout=borrow_timeout,
+            statement_cache_size=statement_cache_size,
+        )
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="db")
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+
+    def stats(self):
+        """
+        :return: PoolStats of the underlying connection pool
+        """
+        return self.db.stats()
+
+    async def execute(self, query, params=None, prepared=False):
+        """
+        Execute a query without blocking the event loop.
+        :param query: SQL query to execute
+        :param params: Parameters for the query
+        :param prepared: Run the query as a cached server-side prepared statement, see DatabaseHelper.execute
+        :return: Rows returned by the query
+        """
+        return await self._run(self.db.execute, query, params, prepared)
+
+    async def iterate(self, query, params=None, batch_size=1000):
+        """
+        Async counterpart of DatabaseHelper.iterate, each batch is fetched on the executor.
+        :param query: SQL query to execute
+        :param params: Parameters for the query
+        :param batch_size: Rows fetched per batch
+        :return: Async generator of lists of rows
+        """
+        batches = self.db.iterate(query, params, batch_size)
+        try:
+            while True:
+                rows = await self._run(next, batches, None)
+                if rows is None:
+                    return
+                yield rows
+        finally:
+            await self._run(batches.close)
+
+    async def executemany(self, query, values):
+        """
+        Execute a query for every set of values without blocking the event loop.
+        :param query: SQL query to execute
+        :param values: Sequence of parameter tuples
+        :return: Rows returned by the query
+        """
+        return await self._run(self.db.executemany, query, values)
+
+    def close(self):
+        """
+        Wait for in-flight queries and shut the executor down.
+        """
+        self.executor.shutdown(wait=True)
+
+
+class WriteBehindBuffer:
+    """
+    Accumulates link inserts and flag updates and writes them in batches.
+
+    Calls only append to in-memory buffers, so they are cheap to make from
+    crawler handlers. A background thread flushes the buffers as multi-row
+    `INSERT ... ON DUPLICATE KEY UPDATE` and `UPDATE ... WHERE link IN (...)`
+    statements whenever `max_batch` rows are pending or every `flush_interval`
+    seconds. Pending rows are flushed on close() and at interpreter exit.
+    Rows of a batch that fails on a lost connection are re-queued; a batch the
+    server rejects is retried row by row and the rejected rows are dropped.
+
+    Usage:
+        write_buffer = WriteBehindBuffer(db_helper)
+        write_buffer.insert_links("ward", links)
+        write_buffer.update_flag("district", link)
+        ...
+        write_buffer.close()
+    """
+
+    def __init__(self, db_helper, max_batch=500, flush_interval=2.0):
+        """
+        :param db_helper: DatabaseHelper the batches are written through
+        :param max_batch: Pending rows that trigger a flush, also the maximum rows per statement
+        :param flush_interval: Maximum seconds a row stays buffered
+        """
+        self.db_helper = db_helper
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._inserts = {}  # table -> {link: flag}
+        self._flags = {}  # (table, flag) -> {link: None}
+        self._pending = 0
+        self.discarded = 0
+        self._wakeup = threading.Event()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def insert_links(self, table, links, flag=False):
+        """
+        Queue links for insertion into the table. Duplicates are ignored.
+        :param table: Table name
+        :param links: Links to insert
+        :param flag: Flag to insert the links with
+        """
+        with self._lock:
+            rows = self._inserts.setdefault(table, {})
+            for link in links:
+                if link not in rows:
+                    rows[link] = flag
+                    self._pending += 1
+            self._wake_if_full()
+
+    def update_flag(self, table, link, flag=True):
+        """
+        Queue a flag update for a link in the table.
+        """
+        with self._lock:
+            links = self._flags.setdefault((table, flag), {})
+            if link not in links:
+                links[link] = None
+                self._pending += 1
+            self._wake_if_full()
+
+    def _wake_if_full(self):
+        if self._pending >= self.max_batch:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Write every pending insert, then every pending flag update.
+        On a transient error the rows not written yet are re-queued and the error is raised,
+        rows the server rejects are logged and dropped.
+        """
+        with self._flush_lock:
+            with self._lock:
+                inserts, self._inserts = self._inserts, {}
+                flags, self._flags = self._flags, {}
+                self._pending = 0
+
+            insert_items = list(inserts.items())
+            for i, (table, rows) in enumerate(insert_items):
+                rows = list(rows.items())
+                for start in range(0, len(rows), self.max_batch):
+                    try:
+                        self._write(self._insert_batch, (table,), rows[start:start + self.max_batch])
+                    except Exception:
+                        self._requeue_inserts([(table, rows[start:])] + [
+                            (later_table, list(later_rows.items())) for later_table, later_rows in insert_items[i + 1:]
+                        ])
+                        self._requeue_flags(list(flags.items()))
+                        raise
+
+            flag_items = list(flags.items())
+            for i, (key, links) in enumerate(flag_items):
+                links = list(links)
+                for start in range(0, len(links), self.max_batch):
+                    try:
+                        self._write(self._update_batch, key, links[start:start + self.max_batch])
+                    except Exception:
+                        self._requeue_flags([(key, links[start:])] + flag_items[i + 1:])
+                        raise
+
+    @staticmethod
+    def _is_transient(error):
+        return isinstance(error, (OperationalError, InterfaceError, PoolTimeoutError))
+
+    def _write(self, write_batch, key, rows):
+        """
+        Write one batch, retrying it row by row when the server rejects it.
+        Rejected rows are logged and dropped, transient errors are raised.
+        """
+        try:
+            write_batch(*key, rows)
+        except Exception as e:
+            if self._is_transient(e):
+                raise
+            if len(rows) == 1:
+                logging.error(f"Dropping write-behind row {rows[0]} for {key[0]}: {e}")
+                self.discarded += 1
+                return
+            for row in rows:
+                self._write(write_batch, key, [row])
+
+    def _insert_batch(self, table, batch):
+        placeholders = ", ".join(["(%s, %s)"] * len(batch))
+        params = [value for row in batch for value in row]
+        self.db_helper.execute(
+            f"INSERT INTO {table} (link, flag) VALUES {placeholders} ON DUPLICATE KEY UPDATE id = id",
+            params,
+        )
+
+    def _update_batch(self, table, flag, links):
+        placeholders = ", ".join(["%s"] * len(links))
+        self.db_helper.execute(
+            f"UPDATE {table} SET flag = %s WHERE link IN ({placeholders})",
+            [flag, *links],
+        )
+
+    def _requeue_inserts(self, inserts):
+        with self._lock:
+            for table, items in inserts:
+                rows = self._inserts.setdefault(table, {})
+                for link, flag in items:
+                    if link not in rows:
+                        rows[link] = flag
+                        self._pending += 1
+
+    def _requeue_flags(self, flags):
+        with self._lock:
+            for key, links in flags:
+                pending = self._flags.setdefault(key, {})
+                for link in links:
+                    if link not in pending:
+                        pending[link] = None
+                        self._pending += 1
+
+    def _run(self):
+        while not self._closed.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Error flushing write-behind buffer: {e}")
+
+    def close(self):
+        """
+        Stop the background thread and flush everything still pending.
+        """
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._wakeup.set()
+        self._thread.join()
+        atexit.unregister(self.close)
+        self.flush()
@@ -0,0 +1,135 @@
+import importlib.util
+import logging
+
+try:
+    import httpx
+except ImportError:  # optional, only needed when the fast path is enabled, install httpx[http2]
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean the site wants a real browser, not that the page is missing
+CHALLENGE_STATUS_CODES = (403, 429, 503)
+CHALLENGE_MARKERS = (
+    "g-recaptcha",
+    "recaptcha-checkbox",
+    "cf-chl",
+    "challenge-platform",
+    "cf-browser-verification",
+    "captcha-delivery",
+)
+# Headers the HTTP client sets itself and must not be copied from the browser
+SKIPPED_HEADERS = ("host", "content-length", "connection", "accept-encoding")
+
+
+def looks_like_challenge(status: int, body: str) -> bool:
+    """Return True if a response looks like a bot challenge rather than the requested page"""
+    if status in CHALLENGE_STATUS_CODES:
+        return True
+    head = body[:20000].lower()
+    return any(marker in head for marker in CHALLENGE_MARKERS)
+
+
+def proxy_url(proxy) -> str:
+    """Convert a Playwright proxy setting into a proxy URL for the HTTP client"""
+    if not proxy:
+        return None
+    if isinstance(proxy, str):
+        return proxy
+    server = proxy["server"]
+    if "://" not in server:
+        server = f"http://{server}"
+    if proxy.get("username"):
+        scheme, rest = server.split("://", 1)
+        server = f"{scheme}://{proxy['username']}:{proxy.get('password', '')}@{rest}"
+    return server
+
+
+class HttpFastPath:
+    """
+    Pooled HTTP/2 keep-alive clients that replay a browser session's credentials.
+
+    The browser is only used to obtain cookies and request headers; bulk GETs go
+    through one httpx client per session, using the session's proxy, headers and
+    cookies. Callers fall back to the browser when `looks_like_challenge` flags
+    a response, then hand the refreshed cookies back with `refresh`.
+    """
+
+    def __init__(self, http2: bool = True, max_connections: int = 20, timeout: float = 30):
+        """
+        Create a HttpFastPath.
+
+        Args:
+            http2 (bool): Whether or not to negotiate HTTP/2, requires the h2 package (httpx[http2]), HTTP/1.1 is used without it.
+            max_connections (int): The maximum number of pooled connections per session.
+            timeout (float): The request timeout in seconds.
+        """
+        if httpx is None:
+            raise ImportError("The HTTP fast path requires the httpx package, install httpx[http2]")
+        if http2 and importlib.util.find_spec("h2") is None:
+            # httpx only raises once the first client is created, which would fail every request
+            logger.warning("The h2 package is not installed, the HTTP fast path falls back to HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.timeout = timeout
+        self._clients = {}  # id(session) -> httpx.AsyncClient
+
+    def has_client(self, session) -> bool:
+        return id(session) in self._clients
+
+    def open(self, session, cookies: dict):
+        """
+        Create the client of a session.
+
+        Args:
+            session (PlaywrightSession): The session whose proxy and headers to use.
+            cookies (dict): The cookies of the session, see PlaywrightHelper.get_session_cookies.
+        """
+        headers = {
+            k: v for k, v in (session.headers or {}).items()
+            if not k.startswith(":") and k.lower() not in SKIPPED_HEADERS
+        }
+        self._clients[id(session)] = httpx.AsyncClient(
+            http2=self.http2,
+            proxy=proxy_url(session.proxy),
+            headers=headers,
+            cookies=cookies,
+            limits=self.limits,
+            timeout=self.timeout,
+            follow_redirects=True,
+        )
+
+    def refresh(self, session, cookies: dict):
+        """Replace the cookies of a session's client, e.g. after the browser passed a challenge"""
+        client = self._clients.get(id(session))
+        if client is not None:
+            client.cookies.clear()
+            client.cookies.update(cookies)
+
+    async def get(self, session, url: str, headers: dict = None):
+        """
+        Send a GET through a session's client.
+
+        Returns:
+            tuple[int, str]: The status code and the response body.
+        """
+        client = self._clients[id(session)]
+        headers = {
+            k: v for k, v in (headers or {}).items()
+            if not k.startswith(":") and k.lower() not in SKIPPED_HEADERS
+        }
+        response = await client.get(url, headers=headers)
+        return response.status_code, response.text
+
+    async def close_session(self, session):
+        """Close the client of a session"""
+        client = self._clients.pop(id(session), None)
+        if client is not None:
+            await client.aclose()
+
+    async def aclose(self):
+        """Close every client"""
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
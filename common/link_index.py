@@ -0,0 +1,87 @@
+import asyncio
+
+
+class LinkIndex:
+    """
+    In-memory index of the links already stored per table.
+
+    Each table is loaded once, lazily, on first use by streaming
+    `SELECT link, flag` in batches and then kept in sync by the caller through
+    `add` and `mark_flag`, so dedup checks are O(1) set lookups instead of a
+    full table scan per crawled page.
+
+    Usage:
+        link_index = LinkIndex(db_helper)
+        links_new = await link_index.filter_new("ward", links)
+        ...insert links_new...
+        await link_index.add("ward", links_new)
+    """
+
+    def __init__(self, db_helper):
+        """
+        :param db_helper: AsyncDatabaseHelper used to load each table
+        """
+        self.db_helper = db_helper
+        self._tables = {}  # table -> {link: flag}
+        self._locks = {}
+
+    async def _load(self, table):
+        index = self._tables.get(table)
+        if index is not None:
+            return index
+        lock = self._locks.setdefault(table, asyncio.Lock())
+        async with lock:
+            if table not in self._tables:
+                index = {}
+                async for rows in self.db_helper.iterate(f"SELECT link, flag FROM {table}"):
+                    index.update((link, bool(flag)) for link, flag in rows)
+                self._tables[table] = index
+        return self._tables[table]
+
+    async def contains(self, table, link):
+        """
+        :return: True if the link is already stored in the table
+        """
+        return link in await self._load(table)
+
+    async def filter_new(self, table, links):
+        """
+        Return the links that are not yet stored in the table, deduplicated and in order.
+        :param table: Table name
+        :param links: Candidate links
+        :return: List of new links
+        """
+        index = await self._load(table)
+        return [link for link in dict.fromkeys(links) if link not in index]
+
+    async def add(self, table, links, flag=False):
+        """
+        Record links that were just inserted. Existing flags are kept.
+        :param table: Table name
+        :param links: Inserted links
+        :param flag: Flag the links were inserted with
+        """
+        index = await self._load(table)
+        for link in links:
+            index.setdefault(link, flag)
+
+    async def mark_flag(self, table, link, flag=True):
+        """
+        Record a flag update for a link.
+        """
+        index = await self._load(table)
+        index[link] = flag
+
+    async def links(self, table, flag=None):
+        """
+        :param table: Table name
+        :param flag: Only return links with this flag, or all links when None
+        :return: List of links
+        """
+        index = await self._load(table)
+        if flag is None:
+            return list(index)
+        return [link for link, link_flag in index.items() if link_flag == flag]
+
+    def __len__(self):
+        return sum(len(index) for index in self._tables.values())
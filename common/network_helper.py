@@ -8,34 +8,57 @@ from config.config import config
 log = Logger(name="network_helper")
 
 class NetworkHelper:
-    def __init__(self):
-        """Initialize with a requests session."""
+    def __init__(self, key=None):
+        """
+        Initialize with a requests session.
+        :param key: Key of the proxy rotation API, defaults to config.KEY_PROXY_ROATE
+        """
+        self.key = key or config.KEY_PROXY_ROATE
         self.session = requests.Session()
 
-    def get_proxy(self):
+    def fetch_proxy(self):
         """
-        Fetch proxy from API and return it as string.
-        Assumes API returns JSON like {"proxyhttp": "http://ip:port"}.
+        Ask the rotation API for a proxy once, without waiting.
+        Assumes API returns JSON like {"status": 100, "proxyhttp": "host:port:user:password"}.
+        :return: (proxy, wait) where proxy is [host, port, user, password] or None,
+                 and wait is the seconds the API asks to wait before rotating again
         """
-        url = f"https://proxyxoay.org/api/get.php?key={config.KEY_PROXY_ROATE}&nhamang=random&&tinhthanh=0"
+        url = f"https://proxyxoay.org/api/get.php?key={self.key}&nhamang=random&&tinhthanh=0"
         response = self.session.get(url, timeout=120)
 
         # Nếu API trả về JSON
         try:
             data = response.json()
-            if data.get("status") == 100:
-                print(f"Proxy: {data.get("proxyhttp")}")
-                return data.get("proxyhttp").split(":")
-            elif data.get("status") == 101:
-                match = re.search(r"(\d+)s", data.get("message"))
-                if match:
-                    seconds = int(match.group(1))
-                    time.sleep(seconds)
-            else:
-                log.error("Chưa đổi được proxy")
-            
         except ValueError:
             # Nếu API trả về plain text (VD: "http://ip:port")
-            raise ValueError
-        finally:
-            self.session.close()
+            raise ValueError(f"Unexpected proxy API response: {response.text[:200]}")
+
+        if data.get("status") == 100:
+            print(f"Proxy: {data.get('proxyhttp')}")
+            return data.get("proxyhttp").split(":"), 0
+        if data.get("status") == 101:
+            match = re.search(r"(\d+)s", data.get("message", ""))
+            if match:
+                return None, int(match.group(1))
+        log.error("Chưa đổi được proxy")
+        return None, 0
+
+    def get_proxy(self, max_attempts=3):
+        """
+        Fetch proxy from API and return it, waiting out the rotation cooldown.
+        Use ProxyPool from async code, it waits without blocking the event loop.
+        :param max_attempts: API calls to make before giving up
+        :return: [host, port, user, password], or None if no proxy could be fetched
+        """
+        for _ in range(max_attempts):
+            proxy, wait = self.fetch_proxy()
+            if proxy is not None:
+                return proxy
+            if not wait:
+                return None
+            time.sleep(wait)
+        return None
+
+    def close(self):
+        """Close the requests session."""
+        self.session.close()
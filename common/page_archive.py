@@ -0,0 +1,127 @@
+import functools
+import gzip
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from config.config import config
+
+
+class PageArchive:
+    """
+    Content-addressed archive of raw crawled pages on top of S3.
+
+    Each page body is stored once under the SHA-256 of its content
+    (`<prefix>/objects/ab/abcdef....html.gz`), so a re-crawl that fetches an
+    unchanged page writes nothing but a manifest line. Every run writes a
+    gzipped JSONL manifest (`<prefix>/manifests/<run_id>.jsonl.gz`) mapping
+    each URL to the hash of the body fetched for it.
+
+    Usage:
+        archive = PageArchive(AsyncS3Helper())
+        await archive.store(url, html)
+        ...
+        await archive.close()
+    """
+
+    def __init__(self, s3, bucket_name=None, prefix="pages", run_id=None, compression="gzip"):
+        """
+        :param s3: AsyncS3Helper used for the uploads
+        :param bucket_name: Bucket holding the archive, defaults to config.BUCKET_NAME
+        :param prefix: Key prefix of the archive
+        :param run_id: Name of this run's manifest, defaults to the current UTC time
+        :param compression: Compression of stored bodies, see S3Helper.put_bytes
+        """
+        self.s3 = s3
+        self.bucket_name = bucket_name or config.BUCKET_NAME
+        self.prefix = prefix
+        self.run_id = run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.compression = compression
+        self.stored = 0
+        self.deduplicated = 0
+        self.failed = 0
+        self._known = set()  # hashes known to be in the bucket
+        self._waiting = {}  # hash being checked or uploaded -> manifest entries waiting for it
+        self._manifest = []
+
+    def object_key(self, digest):
+        suffix = {"gzip": ".gz", "zstd": ".zst"}.get(self.compression, "")
+        return f"{self.prefix}/objects/{digest[:2]}/{digest}.html{suffix}"
+
+    @property
+    def manifest_key(self):
+        return f"{self.prefix}/manifests/{self.run_id}.jsonl.gz"
+
+    def _settle(self, digest, stored):
+        """Record the pages waiting for a hash in the manifest once its body is in the bucket, or drop them."""
+        entries = self._waiting.pop(digest)
+        if stored:
+            self._known.add(digest)
+            self._manifest.extend(entries)
+        else:
+            self.failed += len(entries)
+            print(f"Failed to archive {entries[0]['url']}")
+
+    def _uploaded(self, digest, task):
+        stored = not task.cancelled() and task.exception() is None and task.result()
+        if stored:
+            self.stored += 1
+        self._settle(digest, stored)
+
+    async def store(self, url, body):
+        """
+        Archive a page body, uploading it only if this exact content is not stored yet.
+        The page is added to the manifest once its body is in the bucket, pages whose upload failed are left out.
+        :param url: URL the body was fetched from
+        :param body: Page body as str or bytes
+        :return: SHA-256 hex digest of the body
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        entry = {
+            "url": url,
+            "hash": digest,
+            "size": len(body),
+            "fetched_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if digest in self._known:
+            self.deduplicated += 1
+            self._manifest.append(entry)
+            return digest
+        if digest in self._waiting:
+            # the same content is already being checked or uploaded
+            self.deduplicated += 1
+            self._waiting[digest].append(entry)
+            return digest
+
+        self._waiting[digest] = [entry]
+        key = self.object_key(digest)
+        try:
+            # one HEAD per new hash rather than listing every stored object up front
+            if await self.s3.exists(self.bucket_name, key):
+                self.deduplicated += 1
+                self._settle(digest, True)
+                return digest
+            task = await self.s3.submit_bytes(
+                body, self.bucket_name, key,
+                compression=self.compression, content_type="text/html; charset=utf-8",
+            )
+        except BaseException:
+            self._settle(digest, False)
+            raise
+        task.add_done_callback(functools.partial(self._uploaded, digest))
+        return digest
+
+    async def close(self):
+        """
+        Wait for pending uploads and write this run's manifest.
+        """
+        await self.s3.join()
+        lines = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in self._manifest)
+        await self.s3.put_bytes(
+            gzip.compress(lines.encode("utf-8")), self.bucket_name, self.manifest_key,
+            content_type="application/x-ndjson",
+        )
+        print(f"Archived {len(self._manifest)} pages: {self.stored} stored, {self.deduplicated} deduplicated, "
+              f"{self.failed} failed")
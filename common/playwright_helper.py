@@ -1,16 +1,29 @@
 import asyncio
 import logging
 import dataclasses
-from typing import Any
+from typing import TYPE_CHECKING, Any
 import random
 import json
+import time
 
-from playwright.async_api import async_playwright, TimeoutError
+from playwright.async_api import async_playwright
 from urllib.parse import urlencode, quote, urlparse
-from common.stealth import stealth_async
+from common.stealth import StealthConfig, stealth_context_async
+from common.session_pool import SessionHealth, SessionHealthPolicy, SessionPool
+from common.http_fast_path import CHALLENGE_STATUS_CODES, HttpFastPath, looks_like_challenge
+from common.retry_policy import RetryBudget, RetryPolicy
+from common.x_bogus_signer import XBogusSigner
+from common.session_snapshots import SessionSnapshotStore
+from common.resource_policy import ResourcePolicy
+from common.asset_cache import AssetCache
+
+if TYPE_CHECKING:
+    from common.proxy_pool import ProxyPool
 
 from .playwright_exceptions import (
+    CaptchaException,
     InvalidJSONException,
+    InvalidResponseException,
     EmptyResponseException,
 )
 
@@ -31,6 +44,26 @@ class PlaywrightSession:
     headers: dict = None
     ms_token: str = None
     base_url: str = None # example: "https://www.tiktok.com"
+    in_flight: int = 0
+    health: SessionHealth = dataclasses.field(default_factory=SessionHealth)
+    retired: bool = False
+    browser: Any = None
+    saved_at: float = None  # when the snapshot a session was restored from was first saved
+
+@dataclasses.dataclass
+class WarmupStats:
+    """Seconds spent in each phase of session warm-up, summed over all sessions"""
+
+    sessions: int = 0
+    second_navigations: int = 0
+    phases: dict = dataclasses.field(default_factory=dict)  # phase -> seconds
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def averages(self) -> dict:
+        """Return the average seconds per session of each phase"""
+        return {phase: seconds / max(self.sessions, 1) for phase, seconds in self.phases.items()}
 
 class PlaywrightHelper:
     """The main Playwright_Helper class that contains all the endpoints.
@@ -51,6 +84,22 @@ class PlaywrightHelper:
             logger_name (str): The name of the logger you want to use.
         """
         self.sessions = []
+        self.browsers = []
+        self.session_pool = SessionPool(self.sessions)
+        self.health_policy = SessionHealthPolicy()
+        self._session_options = {}
+        self._background_tasks = set()
+        self._warmup_semaphore = asyncio.Semaphore(8)
+        self.warmup_stats = WarmupStats()
+        self.snapshot_store = None
+        self.stealth = None
+        self.resource_policy = None
+        self.asset_cache = None
+        self.proxy_pool = None
+        self.fast_path = None
+        self.signer = XBogusSigner()
+        self.retry_policy = RetryPolicy()
+        self.retry_budget = RetryBudget(self.retry_policy.host_retry_budget, self.retry_policy.budget_window)
 
         if logger_name is None:
             logger_name = __name__
@@ -69,18 +118,22 @@ class PlaywrightHelper:
 
     async def __set_session_params(self, session: PlaywrightSession, params_additional: dict = None):
         """Set the session params for a PlaywrightSession"""
-        user_agent = await session.page.evaluate("() => navigator.userAgent")
-        language = await session.page.evaluate(
-            "() => navigator.language || navigator.userLanguage"
+        navigator = await session.page.evaluate(
+            """() => ({
+                user_agent: navigator.userAgent,
+                language: navigator.language || navigator.userLanguage,
+                platform: navigator.platform,
+                timezone: Intl.DateTimeFormat().resolvedOptions().timeZone,
+            })"""
         )
-        platform = await session.page.evaluate("() => navigator.platform")
+        user_agent = navigator["user_agent"]
+        language = navigator["language"]
+        platform = navigator["platform"]
+        timezone = navigator["timezone"]
         device_id = str(random.randint(10**18, 10**19 - 1))  # Random device id
         history_len = str(random.randint(1, 10))  # Random history length
         screen_height = str(random.randint(600, 1080))  # Random screen height
         screen_width = str(random.randint(800, 1920))  # Random screen width
-        timezone = await session.page.evaluate(
-            "() => Intl.DateTimeFormat().resolvedOptions().timeZone"
-        )
 
         session_params = {
             "app_language": language,
@@ -107,12 +160,29 @@ class PlaywrightHelper:
         proxy: str = None,
         context_options: dict = {},
         cookies: dict = None,
-        suppress_resource_load_types: list[str] = None,
         timeout: int = 30000,
+        index: int = None,
+        browser: Any = None,
     ):
+        """Create a PlaywrightSession, appended to the sessions or put in the slot at index"""
+        async with self._warmup_semaphore:
+            await self.__warm_up_session(url, proxy, context_options, cookies, timeout, index, browser)
+
+    async def __warm_up_session(self, url, proxy, context_options, cookies, timeout, index, browser):
+        phase_started = time.monotonic()
+
+        def end_phase(name: str):
+            nonlocal phase_started
+            now = time.monotonic()
+            self.warmup_stats.add(name, now - phase_started)
+            phase_started = now
+
         try:
-            """Create a PlaywrightSession"""
-            context = await self.browser.new_context(proxy=proxy, **context_options)
+            if proxy is None and self.proxy_pool is not None:
+                proxy = (await self.proxy_pool.get()).playwright
+            if browser is None:
+                browser = self._least_used_browser()
+            context = await browser.new_context(proxy=proxy, **context_options)
             if cookies is not None:
                 formatted_cookies = [
                     {"name": k, "value": v, "domain": urlparse(url).netloc, "path": "/"}
@@ -120,8 +190,7 @@ class PlaywrightHelper:
                     if v is not None
                 ]
                 await context.add_cookies(formatted_cookies)
-            page = await context.new_page()
-            await stealth_async(page)
+            page = await self.__new_page(context, timeout)
     
             # Get the request headers to the url
             request_headers = None
@@ -131,20 +200,15 @@ class PlaywrightHelper:
                 request_headers = request.headers
     
             page.once("request", handle_request)
+            end_phase("context")
     
-            if suppress_resource_load_types is not None:
-                await page.route(
-                    "**/*",
-                    lambda route, request: route.abort()
-                    if request.resource_type in suppress_resource_load_types
-                    else route.continue_(),
-                )
-            
-            # Set the navigation timeout
-            page.set_default_navigation_timeout(timeout)
-    
-            await page.goto(url)
-            await page.goto(url) # hack: many website blocks first request not sure why, likely bot detection
+            response = await page.goto(url)
+            end_phase("navigation")
+            # many websites block the first request, likely bot detection, so load again only when that happened
+            if response is None or not response.ok or looks_like_challenge(response.status, await page.content()):
+                self.warmup_stats.second_navigations += 1
+                await page.goto(url)
+                end_phase("second_navigation")
             
             # by doing this, we are simulate scroll event using mouse to `avoid` bot detection
             x, y = random.randint(0, 50), random.randint(0, 50)
@@ -160,9 +224,15 @@ class PlaywrightHelper:
                 proxy=proxy,
                 headers=request_headers,
                 base_url=url,
+                browser=browser,
             )
-            self.sessions.append(session)
             await self.__set_session_params(session)
+            end_phase("params")
+            self.warmup_stats.sessions += 1
+            if index is None:
+                self.sessions.append(session)
+            else:
+                self.sessions[index] = session
         except Exception as e:
             # clean up
             self.logger.error(f"Failed to create session: {e}")
@@ -173,6 +243,84 @@ class PlaywrightHelper:
                 await context.close()
             raise  # Re-raise the exception after cleanup
 
+    async def __new_page(self, context, timeout: int):
+        """Open a page with the stealth scripts, resource policy and navigation timeout applied"""
+        await stealth_context_async(context, self.stealth)
+        # registered before the policy, whose routes take precedence, so blocked assets are never fetched
+        if self.asset_cache is not None:
+            await self.asset_cache.apply(context)
+        if self.resource_policy is not None:
+            await self.resource_policy.apply(context)
+        page = await context.new_page()
+
+        # Set the navigation timeout
+        page.set_default_navigation_timeout(timeout)
+        return page
+
+    async def __restore_session(
+        self,
+        snapshot: dict,
+        context_options: dict = {},
+        timeout: int = 30000,
+        browser: Any = None,
+    ):
+        """Create a PlaywrightSession from a snapshot, without the warm-up navigations"""
+        if browser is None:
+            browser = self._least_used_browser()
+        context = await browser.new_context(
+            proxy=snapshot.get("proxy"), storage_state=snapshot["storage_state"], **context_options
+        )
+        try:
+            page = await self.__new_page(context, timeout)
+            # Only wait for the response to commit, so in-page fetches run on the site's origin
+            await page.goto(snapshot["base_url"], wait_until="commit")
+        except Exception:
+            await context.close()
+            raise
+        self.sessions.append(
+            PlaywrightSession(
+                context,
+                page,
+                proxy=snapshot.get("proxy"),
+                params=snapshot["params"],
+                headers=snapshot.get("headers"),
+                base_url=snapshot["base_url"],
+                browser=browser,
+                saved_at=snapshot.get("saved_at"),
+            )
+        )
+
+    async def save_snapshots(self, store: SessionSnapshotStore = None):
+        """
+        Save the storage state of every healthy session, so the next run can restore them.
+        Restored sessions keep the saved_at of their snapshot, so restoring doesn't extend their ttl.
+
+        Args:
+            store (SessionSnapshotStore): Where to save the snapshots, defaults to the store passed to create_sessions.
+        """
+        store = store or self.snapshot_store
+        if store is None:
+            raise ValueError("No snapshot store configured")
+        sessions = [
+            session for session in self.sessions
+            if not session.retired and not self.health_policy.is_unhealthy(session.health)
+        ]
+        states = await asyncio.gather(*(session.context.storage_state() for session in sessions))
+        await store.save(
+            [
+                {
+                    "base_url": session.base_url,
+                    "proxy": session.proxy,
+                    "headers": session.headers,
+                    "params": session.params,
+                    "storage_state": state,
+                    "saved_at": session.saved_at,
+                }
+                for session, state in zip(sessions, states)
+            ]
+        )
+        self.logger.info(f"Saved {len(sessions)} session snapshots")
+
     async def create_sessions(
         self,
         num_sessions=5,
@@ -186,6 +334,18 @@ class PlaywrightHelper:
         browser: str = "chromium",
         executable_path: str = None,
         timeout: int = 30000,
+        max_in_flight_per_session: int = 1,
+        session_selection: str = "least_loaded",
+        health_policy: SessionHealthPolicy = None,
+        num_browsers: int = 1,
+        http_fast_path: bool = False,
+        retry_policy: RetryPolicy = None,
+        warmup_concurrency: int = 8,
+        snapshot_store: SessionSnapshotStore = None,
+        stealth: StealthConfig | str = None,
+        resource_policy: ResourcePolicy = None,
+        asset_cache: AssetCache = None,
+        proxy_pool: "ProxyPool" = None,
     ):
         """
         Create sessions for use within the PlaywrightHelper class.
@@ -201,29 +361,90 @@ class PlaywrightHelper:
             context_options (dict): Options to pass to the playwright context.
             override_browser_args (list[dict]): A list of dictionaries containing arguments to pass to the browser.
             cookies (list[dict]): A list of cookies to use for the sessions, you can get these from your cookies after visiting website.
-            suppress_resource_load_types (list[str]): Types of resources to suppress playwright from loading, excluding more types will make playwright faster.. Types: document, stylesheet, image, media, font, script, textrack, xhr, fetch, eventsource, websocket, manifest, other.
+            suppress_resource_load_types (list[str]): Types of resources to suppress playwright from loading, excluding more types will make playwright faster.. Types: document, stylesheet, image, media, font, script, texttrack, xhr, fetch, eventsource, websocket, manifest, other. Ignored when resource_policy is given.
             browser (str): firefox, chromium, or webkit; default is chromium
             executable_path (str): Path to the browser executable
             timeout (int): The timeout in milliseconds for page navigation
+            max_in_flight_per_session (int): The maximum number of concurrent make_request calls per session, callers wait when every session is busy.
+            session_selection (str): How make_request picks a session, least_loaded or round_robin.
+            health_policy (SessionHealthPolicy): Thresholds on error rate, empty responses and latency beyond which a session is closed and replaced in the background.
+            num_browsers (int): The amount of browser processes to launch, sessions are spread evenly across them so rendering uses more than one core. See common.playwright_workers to also spread the event loop across processes.
+            http_fast_path (bool): Whether or not to send make_request through a pooled HTTP/2 client that reuses each session's cookies and headers, falling back to the browser when a challenge is detected. Requires httpx, and h2 for HTTP/2 (pip install httpx[http2]), otherwise HTTP/1.1 is used.
+            retry_policy (RetryPolicy): The default retry policy of make_request.
+            warmup_concurrency (int): The maximum number of sessions loading their starting url at once, also applies to replacements. Per-phase timings end up in warmup_stats.
+            snapshot_store (SessionSnapshotStore): Where to restore sessions from instead of warming them up, while their snapshots are valid. Snapshots are saved again by close_sessions.
+            stealth (StealthConfig | str): The stealth config or profile name (minimal, standard, full) applied to every session, defaults to StealthConfig().
+            resource_policy (ResourcePolicy): The types, hosts and urls to block and the static files to serve locally, in every session.
+            asset_cache (AssetCache): A disk cache of stylesheets, scripts, fonts and images shared by every session, so identical assets are downloaded once.
+            proxy_pool (ProxyPool): Where sessions, including replacements, get their proxy from when proxies is not given. Request outcomes are reported back to it.
         """
+        self.session_pool = SessionPool(
+            self.sessions, max_in_flight=max_in_flight_per_session, strategy=session_selection
+        )
+        self.health_policy = health_policy or SessionHealthPolicy()
+        self.fast_path = HttpFastPath() if http_fast_path else None
+        self._warmup_semaphore = asyncio.Semaphore(warmup_concurrency)
+        self.snapshot_store = snapshot_store
+        self.stealth = stealth
+        if resource_policy is None and suppress_resource_load_types is not None:
+            resource_policy = ResourcePolicy.from_resource_types(suppress_resource_load_types)
+        self.resource_policy = resource_policy
+        self.asset_cache = asset_cache
+        self.proxy_pool = proxy_pool
+        if retry_policy is not None:
+            self.retry_policy = retry_policy
+            self.retry_budget = RetryBudget(retry_policy.host_retry_budget, retry_policy.budget_window)
+        # Kept to create replacements for retired sessions
+        self._session_options = dict(
+            proxies=proxies,
+            cookies=cookies,
+            url=starting_url,
+            context_options=context_options,
+            timeout=timeout,
+        )
         self.playwright = await async_playwright().start()
         if browser == "chromium":
             if headless and override_browser_args is None:
                 override_browser_args = ["--headless=new"]
                 headless = False  # managed by the arg
-            self.browser = await self.playwright.chromium.launch(
-                headless=headless, args=override_browser_args, proxy=random_choice(proxies), executable_path=executable_path
-            )
+            browser_type = self.playwright.chromium
         elif browser == "firefox":
-            self.browser = await self.playwright.firefox.launch(
-                headless=headless, args=override_browser_args, proxy=random_choice(proxies), executable_path=executable_path
-            )
+            browser_type = self.playwright.firefox
         elif browser == "webkit":
-            self.browser = await self.playwright.webkit.launch(
-                headless=headless, args=override_browser_args, proxy=random_choice(proxies), executable_path=executable_path
-            )
+            browser_type = self.playwright.webkit
         else:
             raise ValueError("Invalid browser argument passed")
+        self.browsers[:] = await asyncio.gather(
+            *(
+                browser_type.launch(
+                    headless=headless, args=override_browser_args, proxy=random_choice(proxies), executable_path=executable_path
+                )
+                for _ in range(num_browsers)
+            )
+        )
+        self.browser = self.browsers[0]
+        if snapshot_store is not None:
+            snapshots = [
+                snapshot for snapshot in await snapshot_store.load()
+                if starting_url is None or snapshot["base_url"] == starting_url
+            ][:num_sessions]
+            restored = await asyncio.gather(
+                *(
+                    self.__restore_session(
+                        snapshot,
+                        context_options=context_options,
+                        timeout=timeout,
+                        browser=self.browsers[n % num_browsers],
+                    )
+                    for n, snapshot in enumerate(snapshots)
+                ),
+                return_exceptions=True,
+            )
+            for error in restored:
+                if isinstance(error, Exception):
+                    self.logger.warning(f"Failed to restore session from snapshot: {error}")
+            self.logger.info(f"Restored {len(self.sessions)} sessions from snapshots")
+        num_restored = len(self.sessions)
         await asyncio.gather(
             *(
                 self.__create_session(
@@ -231,12 +452,93 @@ class PlaywrightHelper:
                     url=starting_url,
                     context_options=context_options,
                     cookies=random_choice(cookies),
-                    suppress_resource_load_types=suppress_resource_load_types,
                     timeout=timeout,
+                    browser=self.browsers[n % num_browsers],
                 )
-                for _ in range(num_sessions)
+                for n in range(num_restored, num_sessions)
             )
         )
+        self.logger.info(
+            f"Warmed up {self.warmup_stats.sessions} sessions "
+            f"({self.warmup_stats.second_navigations} needed a second navigation), "
+            f"average seconds per phase: {self.warmup_stats.averages()}"
+        )
+
+    def _least_used_browser(self):
+        """Return the browser process hosting the fewest active sessions"""
+        load = {id(browser): 0 for browser in self.browsers}
+        for session in self.sessions:
+            if not session.retired and id(session.browser) in load:
+                load[id(session.browser)] += 1
+        return min(self.browsers, key=lambda browser: load[id(browser)])
+
+    @staticmethod
+    def _blames_session(error: Exception, policy: RetryPolicy) -> bool:
+        """Return True if a request failing with this error says something about the session or its proxy"""
+        if isinstance(error, (EmptyResponseException, CaptchaException)):
+            return True
+        if isinstance(error, InvalidResponseException) and error.error_code in CHALLENGE_STATUS_CODES:
+            return True
+        # timeouts, connection errors and retryable statuses, a plain 4xx such as 404 is the page's answer
+        return policy.is_retryable(error)
+
+    def _record_result(self, i: int, session: PlaywrightSession, latency: float, error: Exception = None):
+        """Record a request outcome and retire the session once it becomes unhealthy"""
+        session.health.record(latency, error)
+        if self.proxy_pool is not None and session.proxy is not None:
+            self.proxy_pool.report(session.proxy, latency, failed=error is not None)
+        if session.retired or not self.health_policy.is_unhealthy(session.health):
+            return
+        self.logger.warning(f"Retiring unhealthy session {i}: {session.health}")
+        session.retired = True
+        self.session_pool.replacing.add(i)
+        task = asyncio.create_task(self._replace_session(i, session))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _replace_session(
+        self, i: int, session: PlaywrightSession, max_attempts: int = 3, max_backoff: float = 300
+    ):
+        """
+        Close a retired session once it is idle and create a replacement in its slot.
+
+        Args:
+            i (int): The index of the slot.
+            session (PlaywrightSession): The retired session.
+            max_attempts (int): The failed attempts after which callers stop waiting for this slot, retrying continues in the background.
+            max_backoff (float): The maximum seconds between two attempts.
+        """
+        try:
+            await self.session_pool.wait_idle(session)
+            if self.fast_path is not None:
+                await self.fast_path.close_session(session)
+            try:
+                await session.page.close()
+                await session.context.close()
+            except Exception as e:
+                self.logger.debug(f"Failed to close retired session {i}: {e}")
+
+            options = dict(self._session_options)
+            proxies, cookies = options.pop("proxies"), options.pop("cookies")
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    await self.__create_session(
+                        proxy=random_choice(proxies), cookies=random_choice(cookies), index=i, **options
+                    )
+                    self.logger.info(f"Replaced session {i}")
+                    return
+                except Exception as e:
+                    self.logger.error(f"Failed to replace session {i} (attempt {attempt}): {e}")
+                if attempt == max_attempts:
+                    # let callers pinned to this slot use another session, or fail if none is left
+                    self.session_pool.replacing.discard(i)
+                    await self.session_pool.notify()
+                await asyncio.sleep(min(2**attempt, max_backoff))
+        finally:
+            self.session_pool.replacing.discard(i)
+            await self.session_pool.notify()
 
     async def close_sessions(self):
         """
@@ -331,48 +633,37 @@ class PlaywrightHelper:
         """
         _, session = self._get_session(**kwargs)
 
+        if self.fast_path is not None:
+            if not self.fast_path.has_client(session):
+                self.fast_path.open(session, await self.get_session_cookies(session))
+            status, text = await self.fast_path.get(session, url, headers=headers)
+            if not looks_like_challenge(status, text):
+                if status >= 400:
+                    raise InvalidResponseException(text, f"Request failed {status}", error_code=status)
+                return text
+            self.logger.info(f"Challenge detected on the fast path ({status}), falling back to the browser")
+
         response = await session.context.request.get(url, headers=headers)
 
         if not response.ok:
             # ném lỗi rõ ràng để dễ debug
-            raise Exception(f"Request failed {response.status}: {await response.text()}")
+            text = await response.text()
+            raise InvalidResponseException(text, f"Request failed {response.status}: {text}", error_code=response.status)
 
+        if self.fast_path is not None:
+            # The browser may have been handed fresh clearance cookies
+            self.fast_path.refresh(session, await self.get_session_cookies(session))
         return await response.text()
 
 
     async def generate_x_bogus(self, url: str, **kwargs):
         """Generate the X-Bogus header for a url"""
         _, session = self._get_session(**kwargs)
+        return await self.signer.sign(session, url)
 
-        max_attempts = 5
-        attempts = 0
-        while attempts < max_attempts:
-            attempts += 1
-            try:
-                timeout_time = random.randint(5000, 20000)
-                await session.page.wait_for_function("window.byted_acrawler !== undefined", timeout=timeout_time)
-                break
-            except TimeoutError as e:
-                if attempts == max_attempts:
-                    raise TimeoutError(f"Failed to load tiktok after {max_attempts} attempts, consider using a proxy")
-                
-                try_urls = ["https://www.tiktok.com/foryou", "https://www.tiktok.com", "https://www.tiktok.com/@tiktok", "https://www.tiktok.com/foryou"]
-
-                await session.page.goto(random_choice(try_urls))
-        
-        result = await session.page.evaluate(
-            f'() => {{ return window.byted_acrawler.frontierSign("{url}") }}'
-        )
-        return result
-
-    async def sign_url(self, url: str, **kwargs):
-        """Sign a url"""
-        i, session = self._get_session(**kwargs)
-
-        # TODO: Would be nice to generate msToken here
-
-        # Add X-Bogus to url
-        x_bogus = (await self.generate_x_bogus(url, session_index=i)).get("X-Bogus")
+    @staticmethod
+    def _append_x_bogus(url: str, signature: dict) -> str:
+        x_bogus = (signature or {}).get("X-Bogus")
         if x_bogus is None:
             raise Exception("Failed to generate X-Bogus")
 
@@ -384,14 +675,39 @@ class PlaywrightHelper:
 
         return url
 
+    async def sign_url(self, url: str, **kwargs):
+        """Sign a url"""
+        i, session = self._get_session(**kwargs)
+
+        # TODO: Would be nice to generate msToken here
+
+        # Add X-Bogus to url
+        return self._append_x_bogus(url, await self.generate_x_bogus(url, session_index=i))
+
+    async def sign_urls(self, urls: list[str], **kwargs) -> list[str]:
+        """
+        Sign many urls with a single evaluate in the session's page.
+
+        Args:
+            urls (list[str]): The urls to sign.
+            session_index (int): The index of the session you want to use, if not provided a random session will be used.
+
+        Returns:
+            list[str]: The urls with their X-Bogus param appended.
+        """
+        _, session = self._get_session(**kwargs)
+        signatures = await self.signer.sign_many(session, urls)
+        return [self._append_x_bogus(url, signature) for url, signature in zip(urls, signatures)]
+
     async def make_request(
         self,
         url: str,
         headers: dict = None,
         params: dict = None,
-        retries: int = 3,
-        exponential_backoff: bool = True,
+        retries: int = None,
+        exponential_backoff: bool = None,
         is_sign_url: bool = False,
+        retry_policy: RetryPolicy = None,
         **kwargs,
     ):
         """
@@ -401,9 +717,10 @@ class PlaywrightHelper:
             url (str): The url to make the request to.
             headers (dict): The headers to use for the request.
             params (dict): The params to use for the request.
-            retries (int): The amount of times to retry the request if it fails.
-            exponential_backoff (bool): Whether or not to use exponential backoff when retrying the request.
-            session_index (int): The index of the session you want to use, if not provided a random session will be used.
+            retries (int): The amount of attempts before giving up, overrides retry_policy.max_attempts.
+            exponential_backoff (bool): Whether or not to use exponential backoff when retrying the request, overrides retry_policy.exponential.
+            retry_policy (RetryPolicy): How to retry transient failures, defaults to the policy given to create_sessions.
+            session_index (int): The index of the session you want to use, if not provided the session pool picks the least loaded one and switches session on retry.
 
         Returns:
             dict: The json response from website.
@@ -411,61 +728,86 @@ class PlaywrightHelper:
         Raises:
             Exception: If the request fails.
         """
-        i, session = self._get_session(**kwargs)
-        if session.params is not None:
-            params = {**(session.params or {}), **(params or {})}
-        else:
-            params = session.params
-
-        if headers is not None:
-            headers = {**(session.headers or {}), **(headers or {})}
-        else:
-            headers = session.headers
-
-        if is_sign_url:
-            encoded_params = f"{url}?{urlencode(params, safe='=', quote_via=quote)}"
-            final_url = await self.sign_url(encoded_params, session_index=i)
-        else:
-            final_url = f"{url}?{urlencode(params, safe='=', quote_via=quote)}"
-
-        retry_count = 0
-        while retry_count < retries:
-            retry_count += 1
-            result = await self.run_fetch_script(
-                final_url, headers=headers, session_index=i
-            )
-
-            if result is None:
-                raise Exception("PlaywrightHelper.run_fetch_script returned None")
-
-            if result == "":
-                raise EmptyResponseException(result, "Website returned an empty response. They are detecting you're a bot, try some of these: headless=False, browser='webkit', consider using a proxy")
-
-            try:
-                return result
-            except Exception as e:
-                if retry_count == retries:
-                    self.logger.error(f"Failed to return response: {result}")
-                    raise e
-
-                self.logger.info(
-                    f"Failed a request, retrying ({retry_count}/{retries})"
-                )
-                if exponential_backoff:
-                    await asyncio.sleep(2**retry_count)
+        policy = retry_policy or self.retry_policy
+        if retries is not None:
+            policy = dataclasses.replace(policy, max_attempts=retries)
+        if exponential_backoff is not None:
+            policy = dataclasses.replace(policy, exponential=exponential_backoff)
+        host = urlparse(url).netloc
+        session_index = kwargs.get("session_index")
+        failed_sessions = set()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            async with self.session_pool.acquire(session_index=session_index, exclude=failed_sessions) as (i, session):
+                request_params = {**(session.params or {}), **(params or {})}
+                request_headers = {**(session.headers or {}), **(headers or {})}
+
+                start = time.monotonic()
+                try:
+                    if is_sign_url:
+                        encoded_params = f"{url}?{urlencode(request_params, safe='=', quote_via=quote)}"
+                        final_url = await self.sign_url(encoded_params, session_index=i)
+                    else:
+                        final_url = f"{url}?{urlencode(request_params, safe='=', quote_via=quote)}"
+
+                    result = await self.run_fetch_script(
+                        final_url, headers=request_headers, session_index=i
+                    )
+
+                    if result is None:
+                        raise Exception("PlaywrightHelper.run_fetch_script returned None")
+
+                    if result == "":
+                        raise EmptyResponseException(result, "Website returned an empty response. They are detecting you're a bot, try some of these: headless=False, browser='webkit', consider using a proxy")
+                except Exception as e:
+                    # errors the session isn't to blame for count as answered requests
+                    blamed = self._blames_session(e, policy)
+                    self._record_result(i, session, time.monotonic() - start, e if blamed else None)
+                    error = e
                 else:
-                    await asyncio.sleep(1)
+                    self._record_result(i, session, time.monotonic() - start)
+                    return result
+
+            if (
+                attempt >= policy.max_attempts
+                or not policy.is_retryable(error)
+                or not self.retry_budget.try_spend(host)
+            ):
+                self.logger.error(f"Failed to return response after {attempt} attempts: {error}")
+                raise error
+
+            delay = policy.delay(attempt)
+            self.logger.info(
+                f"Failed a request ({error}), retrying in {delay:.1f}s ({attempt}/{policy.max_attempts})"
+            )
+            if policy.switch_session:
+                failed_sessions.add(i)
+            await asyncio.sleep(delay)
 
     async def close_sessions(self):
         """Close all the sessions. Should be called when you're done with the PlaywrightHelper object"""
+        for task in list(self._background_tasks):
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        if self.snapshot_store is not None and self.sessions:
+            try:
+                await self.save_snapshots()
+            except Exception as e:
+                self.logger.error(f"Failed to save session snapshots: {e}")
+        if self.fast_path is not None:
+            await self.fast_path.aclose()
         for session in self.sessions:
             await session.page.close()
             await session.context.close()
         self.sessions.clear()
 
     async def stop_playwright(self):
-        """Stop the playwright browser"""
-        await self.browser.close()
+        """Stop the playwright browsers"""
+        for browser in self.browsers:
+            await browser.close()
+        self.browsers.clear()
         await self.playwright.stop()
 
     async def get_session_content(self, url: str, **kwargs):
@@ -0,0 +1,239 @@
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import threading
+
+from . import playwright_exceptions
+
+
+def _worker_main(worker_id: int, requests, results, create_sessions_kwargs: dict, logging_level: int):
+    """Entry point of a worker process: one event loop, one PlaywrightHelper"""
+    asyncio.run(_worker_loop(worker_id, requests, results, create_sessions_kwargs, logging_level))
+
+
+async def _worker_loop(worker_id: int, requests, results, create_sessions_kwargs: dict, logging_level: int):
+    from .playwright_helper import PlaywrightHelper
+
+    loop = asyncio.get_running_loop()
+    async with PlaywrightHelper(logging_level=logging_level, logger_name=f"{__name__}.worker{worker_id}") as api:
+        try:
+            await api.create_sessions(**create_sessions_kwargs)
+        except Exception as e:
+            results.put((worker_id, None, None, _dump_error(e)))
+            return
+        results.put((worker_id, None, "ready", None))
+
+        async def handle(request_id, kwargs):
+            try:
+                results.put((worker_id, request_id, await api.make_request(**kwargs), None))
+            except Exception as e:
+                results.put((worker_id, request_id, None, _dump_error(e)))
+
+        tasks = set()
+        while True:
+            message = await loop.run_in_executor(None, requests.get)
+            if message is None:
+                break
+            task = asyncio.create_task(handle(*message))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+
+
+def _dump_error(error: Exception):
+    if isinstance(error, playwright_exceptions.PlaywrightException):
+        # the raw message, str() would prefix it with the error code
+        return type(error).__name__, error.message, error.error_code
+    return type(error).__name__, str(error), None
+
+
+def _load_error(error) -> Exception:
+    name, message, error_code = error
+    cls = getattr(playwright_exceptions, name, None)
+    if isinstance(cls, type) and issubclass(cls, playwright_exceptions.PlaywrightException):
+        return cls(None, message, error_code)
+    return Exception(f"{name}: {message}")
+
+
+class PlaywrightWorkerPool:
+    """
+    Spreads PlaywrightHelper sessions over several worker processes.
+
+    Each worker runs its own event loop, Playwright driver and browsers, so
+    page rendering and the Python side of the crawl both scale across cores.
+    `make_request` keeps the PlaywrightHelper signature and is dispatched to the
+    worker with the fewest requests in flight. A worker that dies, e.g. when its
+    browser crashes the process, fails its pending requests and is restarted.
+
+    Usage:
+        async with PlaywrightWorkerPool(num_workers=4) as api:
+            await api.create_sessions(num_sessions=5, starting_url=BASE_URL)
+            html = await api.make_request(url=BASE_URL)
+    """
+
+    def __init__(self, num_workers: int = None, logging_level: int = logging.WARN, liveness_interval: float = 1.0):
+        """
+        Create a PlaywrightWorkerPool.
+
+        Args:
+            num_workers (int): The amount of worker processes, defaults to the number of CPUs.
+            logging_level (int): The logging level used inside the workers.
+            liveness_interval (float): The seconds between two checks that every worker process is still alive.
+        """
+        self.num_workers = num_workers or multiprocessing.cpu_count()
+        self.logging_level = logging_level
+        self.liveness_interval = liveness_interval
+        self.logger = logging.getLogger(__name__)
+        self._mp = multiprocessing.get_context("spawn")
+        self._processes = []
+        self._requests = []
+        self._results = None
+        self._in_flight = []
+        self._futures = {}  # request id -> (worker id, future)
+        self._ids = itertools.count()
+        self._reader = None
+        self._ready = None
+        self._loop = None
+        self._kwargs = None
+        self._monitor = None
+
+    async def create_sessions(self, **kwargs):
+        """
+        Start the workers and create sessions in each of them.
+
+        Args:
+            **kwargs: Passed to PlaywrightHelper.create_sessions in every worker, num_sessions is per worker.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._kwargs = kwargs
+        self._results = self._mp.Queue()
+        self._ready = [None] * self.num_workers
+        self._requests = [None] * self.num_workers
+        self._processes = [None] * self.num_workers
+        self._in_flight = [0] * self.num_workers
+        for worker_id in range(self.num_workers):
+            self._start_worker(worker_id)
+        self._reader = threading.Thread(target=self._read_results, name="playwright-workers", daemon=True)
+        self._reader.start()
+        self._monitor = asyncio.create_task(self._watch_workers())
+        await asyncio.gather(*self._ready)
+
+    def _start_worker(self, worker_id: int):
+        # a fresh queue, requests left in the queue of a dead worker were already failed
+        requests = self._mp.Queue()
+        process = self._mp.Process(
+            target=_worker_main,
+            args=(worker_id, requests, self._results, self._kwargs, self.logging_level),
+            daemon=True,
+        )
+        self._ready[worker_id] = self._loop.create_future()
+        process.start()
+        self._requests[worker_id] = requests
+        self._processes[worker_id] = process
+        self._in_flight[worker_id] = 0
+
+    async def _watch_workers(self):
+        """Fail the requests of dead workers and restart them"""
+        while True:
+            await asyncio.sleep(self.liveness_interval)
+            for worker_id, process in enumerate(self._processes):
+                ready = self._ready[worker_id]
+                if process.is_alive():
+                    continue
+                if not ready.done():
+                    # a worker that failed to create its sessions reports why and exits cleanly
+                    if process.exitcode != 0:
+                        ready.set_exception(
+                            Exception(f"Worker {worker_id} died while starting with exit code {process.exitcode}")
+                        )
+                    continue
+                if ready.exception() is not None:
+                    # failed to start, which a restart wouldn't fix
+                    continue
+                self.logger.error(f"Worker {worker_id} died with exit code {process.exitcode}, restarting it")
+                error = Exception(f"Worker {worker_id} died with exit code {process.exitcode}")
+                for request_id, (w, future) in list(self._futures.items()):
+                    if w == worker_id:
+                        del self._futures[request_id]
+                        if not future.done():
+                            future.set_exception(error)
+                self._start_worker(worker_id)
+                self._ready[worker_id].add_done_callback(self._log_restart(worker_id))
+
+    def _log_restart(self, worker_id: int):
+        def log(ready):
+            if ready.exception() is not None:
+                self.logger.error(f"Worker {worker_id} failed to restart: {ready.exception()}")
+
+        return log
+
+    def _read_results(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                return
+            self._loop.call_soon_threadsafe(self._resolve, *message)
+
+    def _resolve(self, worker_id, request_id, result, error):
+        if request_id is None:
+            future = self._ready[worker_id]
+        else:
+            if request_id not in self._futures:
+                # already failed when its worker died
+                return
+            _, future = self._futures.pop(request_id)
+            self._in_flight[worker_id] -= 1
+        if future.done():
+            return
+        if error is not None:
+            future.set_exception(_load_error(error))
+        else:
+            future.set_result(result)
+
+    async def make_request(self, url: str, **kwargs):
+        """
+        Make a request through the least busy worker, see PlaywrightHelper.make_request.
+
+        Returns:
+            str: The response body.
+        """
+        if not self._processes:
+            raise Exception("No workers started, please create sessions first")
+        ready = [w for w in range(self.num_workers) if self._ready[w].done() and not self._ready[w].exception()]
+        if not ready:
+            if all(future.done() for future in self._ready):
+                raise Exception("Every worker failed to start")
+            # every worker is restarting, wait for the first one to come back
+            await asyncio.wait([self._ready[w] for w in range(self.num_workers)], return_when=asyncio.FIRST_COMPLETED)
+            return await self.make_request(url, **kwargs)
+        worker_id = min(ready, key=lambda w: self._in_flight[w])
+        request_id = next(self._ids)
+        future = self._loop.create_future()
+        self._futures[request_id] = (worker_id, future)
+        self._in_flight[worker_id] += 1
+        self._requests[worker_id].put((request_id, {"url": url, **kwargs}))
+        return await future
+
+    async def close_sessions(self):
+        """Stop the workers, closing their sessions and browsers"""
+        if self._monitor is not None:
+            self._monitor.cancel()
+            await asyncio.gather(self._monitor, return_exceptions=True)
+            self._monitor = None
+        for requests in self._requests:
+            requests.put(None)
+        for process in self._processes:
+            await asyncio.to_thread(process.join)
+        if self._results is not None:
+            self._results.put(None)
+            await asyncio.to_thread(self._reader.join)
+        self._processes.clear()
+        self._requests.clear()
+        self._in_flight.clear()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close_sessions()
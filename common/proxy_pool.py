@@ -0,0 +1,250 @@
+import asyncio
+import dataclasses
+import logging
+import random
+import time
+
+import requests
+
+from config.config import config
+
+from .network_helper import NetworkHelper
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class Proxy:
+    """A proxy from the rotation API with its observed latency and failures"""
+
+    host: str
+    port: str
+    user: str = None
+    password: str = None
+    latency: float = None  # seconds, exponentially weighted
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+
+    @property
+    def url(self) -> str:
+        if self.user:
+            return f"http://{self.user}:{self.password}@{self.host}:{self.port}"
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def playwright(self) -> dict:
+        """The proxy setting of a Playwright browser context"""
+        proxy = {"server": f"http://{self.host}:{self.port}"}
+        if self.user:
+            proxy.update(username=self.user, password=self.password)
+        return proxy
+
+    @property
+    def failure_rate(self) -> float:
+        return self.failures / self.requests if self.requests else 0.0
+
+    def score(self) -> float:
+        """Lower is better: latency, penalised by the failure rate"""
+        return (self.latency or 1.0) * (1 + 4 * self.failure_rate)
+
+
+def proxy_key(proxy) -> str:
+    """Normalise a Proxy, proxy url or Playwright proxy setting into the url identifying it"""
+    if isinstance(proxy, Proxy):
+        return proxy.url
+    if isinstance(proxy, dict):
+        scheme, server = proxy["server"].split("://", 1) if "://" in proxy["server"] else ("http", proxy["server"])
+        if proxy.get("username"):
+            return f"{scheme}://{proxy['username']}:{proxy.get('password', '')}@{server}".rstrip("/")
+        return f"{scheme}://{server}".rstrip("/")
+    return str(proxy).rstrip("/")
+
+
+class ProxyPool:
+    """
+    Keeps one health-checked proxy ready per rotation API key.
+
+    The rotation API hands out a fixed host:port per key and only rotates the
+    exit IP behind it, so the pool holds one endpoint per key. A background
+    task per key fetches its endpoint, waiting out the API's rotation cooldown
+    with asyncio.sleep instead of blocking the event loop, and health-checks
+    it. Once every key's endpoint is ready the API is not called again. `get`
+    returns a ready proxy immediately; callers `report` how requests through
+    it went. A proxy that looks banned is dropped, and its key asks the API to
+    rotate: the same endpoint coming back is a fresh exit IP, so it is
+    readmitted with its stats reset.
+
+    Usage:
+        pool = ProxyPool()
+        await pool.start()
+        proxy = await pool.get()
+        ...
+        pool.report(proxy, latency=0.8)
+        await pool.close()
+    """
+
+    def __init__(
+        self,
+        network_helpers: list = None,
+        health_check_url: str = "https://www.gstatic.com/generate_204",
+        health_check_timeout: float = 10,
+        max_failure_rate: float = 0.5,
+        max_consecutive_failures: int = 3,
+        min_requests: int = 5,
+        poll_interval: float = 30,
+    ):
+        """
+        Create a ProxyPool.
+
+        Args:
+            network_helpers (list[NetworkHelper]): One client per rotation API key, defaults to the comma separated keys of config.KEY_PROXY_ROATE.
+            health_check_url (str): The url a new proxy must load before it is handed out, None to skip the check.
+            health_check_timeout (float): The timeout of the health check in seconds.
+            max_failure_rate (float): The failure rate beyond which a proxy is dropped, once it served min_requests.
+            max_consecutive_failures (int): The amount of failures in a row after which a proxy is dropped.
+            min_requests (int): The amount of requests before the failure rate is taken into account.
+            poll_interval (float): The seconds to wait before asking the API again when it gave no usable proxy.
+        """
+        if network_helpers is None:
+            keys = [key.strip() for key in config.KEY_PROXY_ROATE.split(",") if key.strip()]
+            network_helpers = [NetworkHelper(key) for key in keys]
+        if not network_helpers:
+            raise ValueError("At least one rotation API key is required")
+        self.network_helpers = network_helpers
+        self.health_check_url = health_check_url
+        self.health_check_timeout = health_check_timeout
+        self.max_failure_rate = max_failure_rate
+        self.max_consecutive_failures = max_consecutive_failures
+        self.min_requests = min_requests
+        self.poll_interval = poll_interval
+        self.proxies = {}  # url -> Proxy, the ready proxies
+        self._cond = asyncio.Condition()
+        self._tasks = []
+        self._background_tasks = set()
+
+    @property
+    def size(self) -> int:
+        """The amount of proxies the pool holds when full, one per key"""
+        return len(self.network_helpers)
+
+    async def start(self):
+        """Start fetching the proxy of every key in the background"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._refill(helper)) for helper in self.network_helpers]
+
+    async def _refill(self, network_helper: NetworkHelper):
+        """Keep the endpoint of one key in the pool, asking the API again only after it was dropped"""
+        url = None
+        while True:
+            async with self._cond:
+                await self._cond.wait_for(lambda: url not in self.proxies)
+            try:
+                fields, wait = await asyncio.to_thread(network_helper.fetch_proxy)
+            except Exception as e:
+                logger.error(f"Failed to fetch a proxy: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            if fields is None:
+                # respect the rotation cooldown, or back off when the API gave nothing
+                await asyncio.sleep(wait or self.poll_interval)
+                continue
+            # a new Proxy, so an endpoint coming back after a rotation starts with fresh stats
+            proxy = Proxy(*fields[:4])
+            latency = await self._check(proxy)
+            if latency is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            proxy.latency = latency
+            async with self._cond:
+                self.proxies[proxy.url] = proxy
+                self._cond.notify_all()
+            url = proxy.url
+            logger.info(f"Proxy {proxy.host}:{proxy.port} ready in {latency:.2f}s")
+
+    def _request(self, proxy: Proxy) -> float:
+        started = time.monotonic()
+        response = requests.get(
+            self.health_check_url,
+            proxies={"http": proxy.url, "https": proxy.url},
+            timeout=self.health_check_timeout,
+        )
+        response.raise_for_status()
+        return time.monotonic() - started
+
+    async def _check(self, proxy: Proxy) -> float:
+        """Return the latency of a request through the proxy, or None if it failed"""
+        if self.health_check_url is None:
+            return 1.0
+        try:
+            return await asyncio.to_thread(self._request, proxy)
+        except Exception as e:
+            logger.warning(f"Proxy {proxy.host}:{proxy.port} failed its health check: {e}")
+            return None
+
+    async def get(self) -> Proxy:
+        """Return a ready proxy, better scoring ones more often, waiting only while none is ready"""
+        await self.start()
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.proxies)
+            proxies = list(self.proxies.values())
+            return random.choices(proxies, weights=[1 / proxy.score() for proxy in proxies])[0]
+
+    async def new_url(self, session_id: str = None, request=None) -> str:
+        """Proxy url for crawlee's ProxyConfiguration(new_url_function=...)"""
+        return (await self.get()).url
+
+    def report(self, proxy, latency: float = None, failed: bool = False, alpha: float = 0.2):
+        """
+        Record the outcome of a request through a proxy.
+
+        Args:
+            proxy (Proxy | str | dict): The proxy, its url or its Playwright proxy setting.
+            latency (float): The duration of the request in seconds, if known.
+            failed (bool): Whether or not the request failed or was blocked.
+            alpha (float): The weight of this request in the latency average.
+        """
+        proxy = self.proxies.get(proxy_key(proxy))
+        if proxy is None:
+            return
+        proxy.requests += 1
+        if failed:
+            proxy.failures += 1
+            proxy.consecutive_failures += 1
+        else:
+            proxy.consecutive_failures = 0
+        if latency is not None:
+            proxy.latency = latency if proxy.latency is None else alpha * latency + (1 - alpha) * proxy.latency
+        if proxy.consecutive_failures >= self.max_consecutive_failures or (
+            proxy.requests >= self.min_requests and proxy.failure_rate > self.max_failure_rate
+        ):
+            self.drop(proxy)
+
+    def drop(self, proxy):
+        """Stop handing out a proxy, e.g. once it is banned, and have its key rotate the exit IP"""
+        proxy = self.proxies.pop(proxy_key(proxy), None)
+        if proxy is None:
+            return
+        logger.warning(f"Dropped proxy {proxy.host}:{proxy.port} after {proxy.failures}/{proxy.requests} failures")
+        # wake the refill task, the lock can't be taken from this synchronous method
+        task = asyncio.get_running_loop().create_task(self._notify())
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def _notify(self):
+        async with self._cond:
+            self._cond.notify_all()
+
+    async def rotate(self, proxy) -> Proxy:
+        """Drop a proxy that got blocked and return another ready one"""
+        self.drop(proxy)
+        return await self.get()
+
+    async def close(self):
+        """Stop fetching and close the API clients"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for network_helper in self.network_helpers:
+            network_helper.close()
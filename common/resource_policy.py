@@ -0,0 +1,132 @@
+import dataclasses
+import re
+
+# resource type -> file extensions it is usually served with
+TYPE_EXTENSIONS = {
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+    "stylesheet": ("css",),
+    "media": ("mp4", "webm", "ogg", "mp3", "wav", "m4a", "m3u8", "ts"),
+    "script": ("js", "mjs"),
+    "manifest": ("webmanifest",),
+}
+RESOURCE_TYPES = (
+    "document", "stylesheet", "image", "media", "font", "script", "texttrack",
+    "xhr", "fetch", "eventsource", "websocket", "manifest", "other",
+)
+# ad and analytics hosts, blocked together with their subdomains
+AD_HOSTS = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "adservice.google.com",
+    "connect.facebook.net",
+    "hotjar.com",
+    "scorecardresearch.com",
+    "criteo.com",
+    "taboola.com",
+    "outbrain.com",
+    "amazon-adsystem.com",
+)
+
+
+def extension_pattern(extensions) -> re.Pattern:
+    """Match urls whose path ends with one of the extensions, ignoring the query string and fragment"""
+    alternatives = "|".join(re.escape(extension) for extension in sorted(set(extensions)))
+    return re.compile(rf"^[^?#]*\.(?:{alternatives})(?:[?#]|$)", re.IGNORECASE)
+
+
+def host_pattern(hosts) -> re.Pattern:
+    """Match urls on one of the hosts or their subdomains"""
+    alternatives = "|".join(re.escape(host) for host in sorted(set(hosts)))
+    return re.compile(rf"^[a-z]+://(?:[^/?#@]*@)?(?:[^/?#:]+\.)?(?:{alternatives})(?::\d+)?(?:[/?#]|$)", re.IGNORECASE)
+
+
+async def _abort(route):
+    await route.abort()
+
+
+@dataclasses.dataclass
+class ResourcePolicy:
+    """
+    Which requests a browser context blocks or answers locally.
+
+    Rules are compiled into as few route patterns as possible and matched by
+    the Playwright driver, so requests that no rule matches never reach Python.
+    Resource types are matched exactly by a catch-all route that inspects
+    every request. With `match_extensions`, types with known file extensions
+    (see TYPE_EXTENSIONS) are instead matched by url in the driver, which is
+    cheaper but approximate: a typed resource without a known extension is
+    let through, and a url with one is blocked whatever its type.
+
+    Usage:
+        policy = ResourcePolicy(block_types=("image", "font"), block_hosts=AD_HOSTS, match_extensions=True)
+        await policy.apply(context)
+    """
+
+    block_types: tuple = ()  # resource types, see RESOURCE_TYPES
+    block_hosts: tuple = ()  # hosts, their subdomains are blocked too
+    block_urls: tuple = ()  # url globs or compiled regular expressions
+    static_files: dict = dataclasses.field(default_factory=dict)  # url glob -> local file served instead
+    match_extensions: bool = False  # match types by file extension in the driver rather than by resource type
+
+    def __post_init__(self):
+        unknown = set(self.block_types) - set(RESOURCE_TYPES)
+        if unknown:
+            raise ValueError(f"Invalid resource types {sorted(unknown)}, expected any of {RESOURCE_TYPES}")
+
+    @classmethod
+    def from_resource_types(cls, types: list[str]):
+        """Create the policy for suppress_resource_load_types, blocking exactly the given resource types"""
+        return cls(block_types=tuple(types or ()))
+
+    def routes(self) -> list:
+        """
+        Compile the rules.
+
+        Returns:
+            list[tuple]: (pattern, handler) pairs, to register in order.
+        """
+        routes = []
+        # registered first so the narrower routes below, which Playwright tries first, take precedence
+        untyped = [t for t in self.block_types if not self.match_extensions or t not in TYPE_EXTENSIONS]
+        if untyped:
+            blocked = frozenset(untyped)
+
+            async def block_by_type(route, request):
+                if request.resource_type in blocked:
+                    await route.abort()
+                else:
+                    await route.fallback()
+
+            routes.append(("**/*", block_by_type))
+        extensions = [e for t in self.block_types if self.match_extensions for e in TYPE_EXTENSIONS.get(t, ())]
+        if extensions:
+            routes.append((extension_pattern(extensions), _abort))
+        if self.block_hosts:
+            routes.append((host_pattern(self.block_hosts), _abort))
+        for url in self.block_urls:
+            routes.append((url, _abort))
+        for url, path in self.static_files.items():
+            routes.append((url, self._fulfil_from(path)))
+        return routes
+
+    @staticmethod
+    def _fulfil_from(path: str):
+        async def fulfil(route):
+            await route.fulfill(path=path)
+
+        return fulfil
+
+    async def apply(self, target):
+        """
+        Register the routes.
+
+        Args:
+            target (BrowserContext | Page): Where to register them, a context covers all of its pages.
+        """
+        for pattern, handler in self.routes():
+            await target.route(pattern, handler)
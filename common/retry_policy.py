@@ -0,0 +1,77 @@
+import asyncio
+import collections
+import dataclasses
+import random
+import time
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from .http_fast_path import httpx
+from .playwright_exceptions import EmptyResponseException, InvalidResponseException
+
+RETRY_ON_EXCEPTIONS = (
+    EmptyResponseException,
+    PlaywrightTimeoutError,
+    PlaywrightError,  # e.g. net::ERR_CONNECTION_RESET or a closed target
+    asyncio.TimeoutError,
+    ConnectionError,
+) + ((httpx.TransportError,) if httpx is not None else ())
+
+
+@dataclasses.dataclass
+class RetryPolicy:
+    """How make_request retries transient failures"""
+
+    max_attempts: int = 3
+    base_delay: float = 1.0  # seconds
+    max_delay: float = 30.0  # seconds
+    exponential: bool = True
+    jitter: float = 0.5  # fraction of the delay that is randomised
+    retry_on_status: tuple = (408, 425, 429, 500, 502, 503, 504)
+    retry_on_exceptions: tuple = RETRY_ON_EXCEPTIONS
+    host_retry_budget: int = 30  # retries allowed per host per budget_window
+    budget_window: float = 60.0  # seconds
+    switch_session: bool = True
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Return True if a request that failed with this error is worth retrying"""
+        if isinstance(error, InvalidResponseException):
+            return error.error_code in self.retry_on_status
+        return isinstance(error, self.retry_on_exceptions)
+
+    def delay(self, attempt: int) -> float:
+        """Return the seconds to wait after the given failed attempt, starting at 1"""
+        delay = self.base_delay * 2 ** (attempt - 1) if self.exponential else self.base_delay
+        delay = min(delay, self.max_delay)
+        return random.uniform(delay * (1 - self.jitter), delay)
+
+
+class RetryBudget:
+    """
+    Caps the retries spent on each host within a sliding window, so an outage of
+    one host turns into fast failures instead of a retry storm.
+    """
+
+    def __init__(self, max_retries: int, window: float):
+        """
+        Create a RetryBudget.
+
+        Args:
+            max_retries (int): The amount of retries allowed per host within the window.
+            window (float): The length of the window in seconds.
+        """
+        self.max_retries = max_retries
+        self.window = window
+        self._spent = collections.defaultdict(collections.deque)
+
+    def try_spend(self, host: str) -> bool:
+        """Take one retry from the host's budget, return False if it is exhausted"""
+        now = time.monotonic()
+        spent = self._spent[host]
+        while spent and now - spent[0] > self.window:
+            spent.popleft()
+        if len(spent) >= self.max_retries:
+            return False
+        spent.append(now)
+        return True
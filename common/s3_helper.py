@@ -1,14 +1,129 @@
+import asyncio
+import functools
+import io
+import os
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+
 import boto3
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from botocore.exceptions import ClientError, NoCredentialsError, PartialCredentialsError
 from config.config import config
+
+try:
+    import zstandard
+except ImportError:  # optional, only needed for compression="zstd"
+    zstandard = None
+
+MB = 1024 * 1024
+STREAM_CHUNK_SIZE = 1 * MB
+DELETE_OBJECTS_MAX_KEYS = 1000
+
+
+@dataclass
+class BatchStats:
+    """Outcome and throughput of a batch S3 operation."""
+
+    operation: str
+    succeeded: int = 0
+    failed: int = 0
+    bytes: int = 0
+    seconds: float = 0.0
+    errors: dict = field(default_factory=dict)  # object name -> error message
+
+    @property
+    def objects_per_second(self):
+        return self.succeeded / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self):
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.operation}: {self.succeeded} ok, {self.failed} failed, "
+            f"{self.bytes / MB:.1f} MB in {self.seconds:.2f}s "
+            f"({self.objects_per_second:.1f} obj/s, {self.bytes_per_second / MB:.1f} MB/s)"
+        )
+
+
+@dataclass
+class S3Object:
+    """An object, or a common prefix when listing with a delimiter, in an S3 bucket."""
+
+    key: str
+    size: int = 0
+    etag: str = None
+    last_modified: datetime = None
+    is_prefix: bool = False
+
+
+def _compressor(compression):
+    """Return a streaming compressor object with compress()/flush() for the given algorithm."""
+    if compression == "gzip":
+        return zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("compression='zstd' requires the zstandard package")
+        return zstandard.ZstdCompressor().compressobj()
+    raise ValueError(f"Unsupported compression: {compression}")
+
+
+class CompressingReader(io.RawIOBase):
+    """Read-only file object that compresses another file object on the fly."""
+
+    def __init__(self, stream, compression, chunk_size=STREAM_CHUNK_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self._compressor = _compressor(compression)
+        self._buffer = bytearray()
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while not self._eof and (size < 0 or len(self._buffer) < size):
+            chunk = self.stream.read(self.chunk_size)
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if chunk:
+                self._buffer += self._compressor.compress(chunk)
+            else:
+                self._buffer += self._compressor.flush()
+                self._eof = True
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
 class S3Helper:
-    def __init__(self, aws_access_key_id=None, aws_secret_access_key=None, region_name=None):
+    def __init__(self, aws_access_key_id=None, aws_secret_access_key=None, region_name=None,
+                 max_workers=8, multipart_threshold=16 * MB, multipart_chunksize=16 * MB, max_concurrency=4):
         """
         Initialize the S3Helper class with AWS credentials and region.
+        :param max_workers: Threads used by the batch operations
+        :param multipart_threshold: Size in bytes above which uploads are split into parts
+        :param multipart_chunksize: Size in bytes of each multipart part
+        :param max_concurrency: Parts transferred in parallel per file
         """
         self.aws_access_key_id = config.AWS_ACCESS_KEY
         self.aws_secret_access_key = config.AWS_SECRET_KEY
         self.region_name = config.AWS_REGION
+        self.max_workers = max_workers
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency,
+        )
+        # Every batch worker may run max_concurrency part transfers at once
+        self.client_config = Config(max_pool_connections=max(10, max_workers * max_concurrency))
         self.s3_client = self._initialize_client()
 
     def _initialize_client(self):
@@ -21,10 +136,11 @@ class S3Helper:
                     's3',
                     aws_access_key_id=self.aws_access_key_id,
                     aws_secret_access_key=self.aws_secret_access_key,
-                    region_name=self.region_name
+                    region_name=self.region_name,
+                    config=self.client_config
                 )
             else:
-                return boto3.client('s3')  # Use default credentials
+                return boto3.client('s3', config=self.client_config)  # Use default credentials
         except (NoCredentialsError, PartialCredentialsError) as e:
             print(f"Error initializing S3 client: {e}")
             raise
@@ -41,13 +157,92 @@ class S3Helper:
             object_name = file_name
 
         try:
-            self.s3_client.upload_file(file_name, bucket_name, object_name)
+            self.s3_client.upload_file(file_name, bucket_name, object_name, Config=self.transfer_config)
             print(f"File {file_name} uploaded to {bucket_name}/{object_name}")
             return True
         except Exception as e:
             print(f"Error uploading file: {e}")
             return False
 
+    def put_bytes(self, data, bucket_name, object_name, compression=None, content_type=None):
+        """
+        Upload in-memory content, e.g. a crawled HTML page, without a temporary file.
+        :param data: str (encoded as UTF-8) or bytes to upload
+        :param bucket_name: Bucket to upload to
+        :param object_name: S3 object name
+        :param compression: None, "gzip" or "zstd"; sets the object's Content-Encoding
+        :param content_type: Content-Type of the object
+        :return: True if the content was uploaded, else False
+        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if compression is not None:
+            compressor = _compressor(compression)
+            data = compressor.compress(data) + compressor.flush()
+        return self._upload_fileobj(io.BytesIO(data), bucket_name, object_name, compression, content_type)
+
+    def put_stream(self, stream, bucket_name, object_name, compression=None, content_type=None):
+        """
+        Upload a readable file object, compressing it on the fly when requested.
+        :param stream: File object opened for reading, in text or binary mode
+        :param bucket_name: Bucket to upload to
+        :param object_name: S3 object name
+        :param compression: None, "gzip" or "zstd"; sets the object's Content-Encoding
+        :param content_type: Content-Type of the object
+        :return: True if the stream was uploaded, else False
+        """
+        if compression is not None:
+            stream = CompressingReader(stream, compression)
+        return self._upload_fileobj(stream, bucket_name, object_name, compression, content_type)
+
+    def _upload_fileobj(self, fileobj, bucket_name, object_name, compression, content_type):
+        extra_args = {}
+        if compression is not None:
+            extra_args["ContentEncoding"] = compression
+        if content_type is not None:
+            extra_args["ContentType"] = content_type
+        try:
+            self.s3_client.upload_fileobj(
+                fileobj, bucket_name, object_name, ExtraArgs=extra_args, Config=self.transfer_config
+            )
+            print(f"Object uploaded to {bucket_name}/{object_name}")
+            return True
+        except Exception as e:
+            print(f"Error uploading object: {e}")
+            return False
+
+    def upload_many(self, files, bucket_name, max_workers=None):
+        """
+        Upload many files to an S3 bucket concurrently.
+        :param files: Iterable of file names, or of (file_name, object_name) tuples
+        :param bucket_name: Bucket to upload to
+        :param max_workers: Upload threads, defaults to the helper's max_workers
+        :return: BatchStats of the batch
+        """
+        stats = BatchStats(operation="upload_many")
+        start = time.monotonic()
+
+        def upload(file_name, object_name):
+            self.s3_client.upload_file(file_name, bucket_name, object_name, Config=self.transfer_config)
+            return os.path.getsize(file_name)
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+            futures = {}
+            for item in files:
+                file_name, object_name = item if isinstance(item, tuple) else (item, item)
+                futures[executor.submit(upload, file_name, object_name)] = object_name
+            for future in as_completed(futures):
+                try:
+                    stats.bytes += future.result()
+                    stats.succeeded += 1
+                except Exception as e:
+                    stats.failed += 1
+                    stats.errors[futures[future]] = str(e)
+
+        stats.seconds = time.monotonic() - start
+        print(f"Uploaded to {bucket_name}: {stats}")
+        return stats
+
     def download_file(self, bucket_name, object_name, file_name):
         """
         Download a file from an S3 bucket.
@@ -64,25 +259,89 @@ class S3Helper:
             print(f"Error downloading file: {e}")
             return False
 
-    def list_files(self, bucket_name):
+    def get_bytes(self, bucket_name, object_name):
+        """
+        Download an object into memory, undoing the compression applied by put_bytes.
+        :param bucket_name: Bucket to download from
+        :param object_name: S3 object name
+        :return: The content as bytes, or None if the object could not be downloaded
+        """
+        try:
+            response = self.s3_client.get_object(Bucket=bucket_name, Key=object_name)
+            data = response["Body"].read()
+        except Exception as e:
+            print(f"Error downloading object: {e}")
+            return None
+        encoding = response.get("ContentEncoding")
+        if encoding == "gzip":
+            data = zlib.decompress(data, zlib.MAX_WBITS | 16)
+        elif encoding == "zstd":
+            if zstandard is None:
+                raise ImportError(f"{object_name} is zstd compressed, reading it requires the zstandard package")
+            data = zstandard.ZstdDecompressor().decompressobj().decompress(data)
+        return data
+
+    def iter_files(self, bucket_name, prefix="", delimiter=None, start_after=None, page_size=1000):
+        """
+        Lazily iterate over the objects of an S3 bucket, one page at a time, so
+        memory stays constant however many objects the bucket holds.
+        :param bucket_name: Bucket name
+        :param prefix: Only list keys starting with this prefix
+        :param delimiter: Group keys sharing a prefix up to this delimiter, yielded with is_prefix=True
+        :param start_after: Only list keys after this key, e.g. to resume an incremental run
+        :param page_size: Keys requested per ListObjectsV2 call
+        :return: Generator of S3Object
+        """
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        kwargs = {"Bucket": bucket_name, "Prefix": prefix, "PaginationConfig": {"PageSize": page_size}}
+        if delimiter:
+            kwargs["Delimiter"] = delimiter
+        if start_after:
+            kwargs["StartAfter"] = start_after
+        for page in paginator.paginate(**kwargs):
+            for item in page.get("CommonPrefixes", []):
+                yield S3Object(key=item["Prefix"], is_prefix=True)
+            for item in page.get("Contents", []):
+                yield S3Object(
+                    key=item["Key"],
+                    size=item["Size"],
+                    etag=item["ETag"].strip('"'),
+                    last_modified=item["LastModified"],
+                )
+
+    def list_files(self, bucket_name, prefix=""):
         """
-        List files in an S3 bucket.
+        List files in an S3 bucket. Use iter_files for big buckets.
         :param bucket_name: Bucket name
+        :param prefix: Only list keys starting with this prefix
         :return: List of file names in the bucket
         """
         try:
-            response = self.s3_client.list_objects_v2(Bucket=bucket_name)
-            if 'Contents' in response:
-                files = [item['Key'] for item in response['Contents']]
-                print(f"Files in bucket {bucket_name}: {files}")
-                return files
-            else:
-                print(f"No files found in bucket {bucket_name}")
-                return []
+            files = [item.key for item in self.iter_files(bucket_name, prefix=prefix)]
+            print(f"Found {len(files)} files in bucket {bucket_name}")
+            return files
         except Exception as e:
             print(f"Error listing files: {e}")
             return []
 
+    def exists(self, bucket_name, object_name):
+        """
+        Check whether an object exists with a HEAD request, without downloading it.
+        :param bucket_name: Bucket name
+        :param object_name: S3 object name
+        :return: True if the object exists, False if it doesn't or the check failed
+        """
+        try:
+            self.s3_client.head_object(Bucket=bucket_name, Key=object_name)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("404", "NoSuchKey", "NotFound"):
+                print(f"Error checking object: {e}")
+            return False
+        except Exception as e:
+            print(f"Error checking object: {e}")
+            return False
+
     def delete_file(self, bucket_name, object_name):
         """
         Delete a file from an S3 bucket.
@@ -96,4 +355,148 @@ class S3Helper:
             return True
         except Exception as e:
             print(f"Error deleting file: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def delete_many(self, bucket_name, object_names, max_workers=None):
+        """
+        Delete many files from an S3 bucket with DeleteObjects, up to 1000 keys per request.
+        :param bucket_name: Bucket name
+        :param object_names: Iterable of S3 object names
+        :param max_workers: Threads sending DeleteObjects requests, defaults to the helper's max_workers
+        :return: BatchStats of the batch
+        """
+        stats = BatchStats(operation="delete_many")
+        start = time.monotonic()
+        object_names = list(object_names)
+        chunks = [
+            object_names[i:i + DELETE_OBJECTS_MAX_KEYS]
+            for i in range(0, len(object_names), DELETE_OBJECTS_MAX_KEYS)
+        ]
+
+        def delete(chunk):
+            return self.s3_client.delete_objects(
+                Bucket=bucket_name,
+                Delete={"Objects": [{"Key": key} for key in chunk], "Quiet": True},
+            )
+
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+            futures = {executor.submit(delete, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    errors = future.result().get("Errors", [])
+                except Exception as e:
+                    errors = [{"Key": key, "Message": str(e)} for key in chunk]
+                for error in errors:
+                    stats.errors[error["Key"]] = error.get("Message", error.get("Code"))
+                stats.failed += len(errors)
+                stats.succeeded += len(chunk) - len(errors)
+
+        stats.seconds = time.monotonic() - start
+        print(f"Deleted from {bucket_name}: {stats}")
+        return stats
+
+
+class AsyncS3Helper:
+    """
+    Awaitable sibling of S3Helper for asyncio crawlers.
+
+    Calls run on a dedicated thread pool sharing one boto3 client and its
+    connection pool. `submit_bytes` archives a page in the background and only
+    waits when `max_in_flight` uploads are already pending, which gives the
+    crawler backpressure instead of an unbounded queue of page bodies.
+
+    Usage:
+        s3 = AsyncS3Helper()
+        await s3.submit_bytes(html, config.BUCKET_NAME, key, compression="gzip")
+        ...
+        await s3.close()
+    """
+
+    def __init__(self, max_workers=8, max_in_flight=32, **s3_options):
+        """
+        :param max_workers: Threads running S3 calls
+        :param max_in_flight: Background uploads allowed before submit_bytes waits
+        :param s3_options: Passed on to S3Helper
+        """
+        self.s3 = S3Helper(max_workers=max_workers, **s3_options)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="s3")
+        self.max_in_flight = max_in_flight
+        self.uploaded = 0
+        self.failed = 0
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._pending = 0
+        self._tasks = set()
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    @property
+    def in_flight(self):
+        return self._pending
+
+    async def upload_file(self, file_name, bucket_name, object_name=None):
+        return await self._run(self.s3.upload_file, file_name, bucket_name, object_name)
+
+    async def put_bytes(self, data, bucket_name, object_name, compression=None, content_type=None):
+        return await self._run(self.s3.put_bytes, data, bucket_name, object_name, compression, content_type)
+
+    async def put_stream(self, stream, bucket_name, object_name, compression=None, content_type=None):
+        return await self._run(self.s3.put_stream, stream, bucket_name, object_name, compression, content_type)
+
+    async def download_file(self, bucket_name, object_name, file_name):
+        return await self._run(self.s3.download_file, bucket_name, object_name, file_name)
+
+    async def get_bytes(self, bucket_name, object_name):
+        return await self._run(self.s3.get_bytes, bucket_name, object_name)
+
+    async def list_files(self, bucket_name, prefix=""):
+        return await self._run(self.s3.list_files, bucket_name, prefix)
+
+    async def exists(self, bucket_name, object_name):
+        return await self._run(self.s3.exists, bucket_name, object_name)
+
+    async def delete_many(self, bucket_name, object_names, max_workers=None):
+        return await self._run(self.s3.delete_many, bucket_name, object_names, max_workers)
+
+    async def submit_bytes(self, data, bucket_name, object_name, compression=None, content_type=None):
+        """
+        Upload in-memory content in the background.
+        Returns as soon as the upload is scheduled, waiting only while max_in_flight uploads are pending.
+        Arguments are the same as S3Helper.put_bytes.
+        :return: The upload task, its result is True if the upload succeeded, else False
+        """
+        await self._slots.acquire()
+        self._pending += 1
+        task = asyncio.create_task(
+            self._background_put(data, bucket_name, object_name, compression, content_type)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _background_put(self, data, bucket_name, object_name, compression, content_type):
+        try:
+            if await self.put_bytes(data, bucket_name, object_name, compression, content_type):
+                self.uploaded += 1
+                return True
+            self.failed += 1
+            return False
+        finally:
+            self._pending -= 1
+            self._slots.release()
+
+    async def join(self):
+        """
+        Wait until every background upload has finished.
+        """
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+
+    async def close(self):
+        """
+        Wait for background uploads and shut the executor down.
+        """
+        await self.join()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,165 @@
+import asyncio
+import dataclasses
+from contextlib import asynccontextmanager
+
+from .playwright_exceptions import EmptyResponseException
+
+STRATEGIES = ("least_loaded", "round_robin")
+
+
+@dataclasses.dataclass
+class SessionHealth:
+    """Request outcomes of a session, with exponentially weighted error rate and latency"""
+
+    requests: int = 0
+    errors: int = 0
+    empty_responses: int = 0
+    consecutive_errors: int = 0
+    error_rate: float = 0.0
+    latency: float = 0.0  # seconds
+
+    def record(self, latency: float, error: Exception = None, alpha: float = 0.2):
+        """
+        Record the outcome of one request.
+
+        Args:
+            latency (float): The duration of the request in seconds.
+            error (Exception): The exception the request failed with, None on success.
+            alpha (float): The weight of this request in the moving averages.
+        """
+        failed = error is not None
+        self.requests += 1
+        if failed:
+            self.errors += 1
+            self.consecutive_errors += 1
+            if isinstance(error, EmptyResponseException):
+                self.empty_responses += 1
+        else:
+            self.consecutive_errors = 0
+        if self.requests == 1:
+            self.error_rate, self.latency = float(failed), latency
+        else:
+            self.error_rate = alpha * failed + (1 - alpha) * self.error_rate
+            self.latency = alpha * latency + (1 - alpha) * self.latency
+
+
+@dataclasses.dataclass
+class SessionHealthPolicy:
+    """Thresholds beyond which a session is retired and replaced"""
+
+    min_requests: int = 5
+    max_error_rate: float = 0.5
+    max_consecutive_errors: int = 3
+    max_latency: float = None  # seconds, None to ignore latency
+
+    def is_unhealthy(self, health: SessionHealth) -> bool:
+        if health.consecutive_errors >= self.max_consecutive_errors:
+            return True
+        if health.requests < self.min_requests:
+            return False
+        if health.error_rate > self.max_error_rate:
+            return True
+        return self.max_latency is not None and health.latency > self.max_latency
+
+
+class SessionPool:
+    """
+    Hands out PlaywrightSessions to concurrent callers.
+
+    Every session accepts at most `max_in_flight` requests at a time. A caller
+    gets the least loaded session (ties broken round-robin) or the next free one
+    in round-robin order, and waits when every session is at its limit.
+    Retired sessions are skipped until their replacement takes their slot; a
+    caller pinned to a retired slot gets another session unless a replacement
+    for that slot is in progress.
+
+    Usage:
+        async with pool.acquire() as (i, session):
+            ...
+    """
+
+    def __init__(self, sessions: list, max_in_flight: int = 1, strategy: str = "least_loaded"):
+        """
+        Create a SessionPool.
+
+        Args:
+            sessions (list): The list of sessions to schedule, shared with the owner so sessions added later are picked up.
+            max_in_flight (int): The maximum number of concurrent requests per session.
+            strategy (str): least_loaded or round_robin.
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Invalid strategy {strategy}, expected one of {STRATEGIES}")
+        self.sessions = sessions
+        self.max_in_flight = max_in_flight
+        self.strategy = strategy
+        self.replacing = set()  # indices of retired slots whose replacement is in progress
+        self._cond = asyncio.Condition()
+        self._next = 0
+
+    def _is_free(self, session) -> bool:
+        return not session.retired and session.in_flight < self.max_in_flight
+
+    def _pick(self, exclude=()):
+        """Return the index of the session to use next, or None if all are busy"""
+        n = len(self.sessions)
+        order = [(self._next + k) % n for k in range(n)]
+        candidates = [i for i in order if i not in exclude and self._is_free(self.sessions[i])]
+        if not candidates:
+            # Every other session is busy or excluded, fall back to excluded ones rather than wait forever
+            candidates = [i for i in order if self._is_free(self.sessions[i])]
+        if not candidates:
+            return None
+        if self.strategy == "least_loaded":
+            i = min(candidates, key=lambda i: self.sessions[i].in_flight)
+        else:
+            i = candidates[0]
+        self._next = (i + 1) % n
+        return i
+
+    @asynccontextmanager
+    async def acquire(self, session_index: int = None, exclude=()):
+        """
+        Reserve a session for one request, waiting until one is free.
+
+        Args:
+            session_index (int): The index of the session you want to use, if not provided, or retired without a replacement in progress, the pool picks one.
+            exclude (Iterable[int]): Indices to avoid if any other session is free, e.g. the session that just failed.
+
+        Yields:
+            tuple[int, PlaywrightSession]: The index of the session and the session.
+        """
+        async with self._cond:
+            while True:
+                if len(self.sessions) == 0:
+                    raise Exception("No sessions created, please create sessions first")
+                if not self.replacing and all(session.retired for session in self.sessions):
+                    raise Exception("All sessions were retired and none could be replaced")
+                pinned = session_index
+                if pinned is not None and self.sessions[pinned].retired and pinned not in self.replacing:
+                    # no replacement is coming for this slot, hand out another session rather than wait forever
+                    pinned = None
+                if pinned is not None:
+                    i = pinned if self._is_free(self.sessions[pinned]) else None
+                else:
+                    i = self._pick(exclude)
+                if i is not None:
+                    break
+                await self._cond.wait()
+            session = self.sessions[i]
+            session.in_flight += 1
+        try:
+            yield i, session
+        finally:
+            async with self._cond:
+                session.in_flight -= 1
+                self._cond.notify_all()
+
+    async def notify(self):
+        """Wake up waiters after sessions were added or replaced"""
+        async with self._cond:
+            self._cond.notify_all()
+
+    async def wait_idle(self, session):
+        """Wait until a session has no request in flight"""
+        async with self._cond:
+            await self._cond.wait_for(lambda: session.in_flight == 0)
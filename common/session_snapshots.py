@@ -0,0 +1,103 @@
+import asyncio
+import json
+import os
+import time
+
+
+class SessionSnapshotStore:
+    """
+    Saves the browser storage state of warmed up sessions so the next run can restore them.
+
+    A snapshot holds a session's storage state (cookies and localStorage), its
+    request headers, proxy and computed params. All snapshots of one name are
+    kept together, either as `<directory>/<name>.json` on disk or as
+    `<prefix>/<name>.json.gz` in S3 / MinIO. Snapshots older than `ttl` are
+    ignored on load, as cookies and tokens expire.
+
+    Usage:
+        store = SessionSnapshotStore(directory=".sessions", name="tiktok")
+        await api.create_sessions(num_sessions=5, starting_url=BASE_URL, snapshot_store=store)
+    """
+
+    def __init__(
+        self,
+        directory: str = None,
+        s3=None,
+        bucket_name: str = None,
+        prefix: str = "session-snapshots",
+        name: str = "default",
+        ttl: float = 6 * 3600,
+    ):
+        """
+        Create a SessionSnapshotStore.
+
+        Args:
+            directory (str): The directory to keep snapshots in, used when s3 is not given.
+            s3 (AsyncS3Helper): The S3 helper to keep snapshots in S3 / MinIO with.
+            bucket_name (str): The bucket holding the snapshots, defaults to config.BUCKET_NAME.
+            prefix (str): The key prefix of the snapshots in the bucket.
+            name (str): The name of the snapshot set, e.g. one per site.
+            ttl (float): The amount of seconds a snapshot stays valid.
+        """
+        if directory is None and s3 is None:
+            raise ValueError("Either a directory or s3 is required")
+        if s3 is not None and bucket_name is None:
+            from config.config import config
+
+            bucket_name = config.BUCKET_NAME
+        self.directory = directory
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.prefix = prefix
+        self.name = name
+        self.ttl = ttl
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{self.name}.json")
+
+    @property
+    def key(self) -> str:
+        return f"{self.prefix}/{self.name}.json.gz"
+
+    async def save(self, snapshots: list[dict]):
+        """
+        Replace the stored snapshots.
+
+        Args:
+            snapshots (list[dict]): The snapshots to store, see PlaywrightHelper.save_snapshots. Their saved_at, when set, is kept so the ttl counts from when the session was authenticated.
+        """
+        saved_at = time.time()
+        data = json.dumps([{**snapshot, "saved_at": snapshot.get("saved_at") or saved_at} for snapshot in snapshots])
+        if self.s3 is not None:
+            await self.s3.put_bytes(data, self.bucket_name, self.key, "gzip", "application/json")
+        else:
+            await asyncio.to_thread(self._write, data)
+
+    def _write(self, data: str):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return f.read()
+
+    async def load(self) -> list[dict]:
+        """Return the stored snapshots that are still valid"""
+        if self.s3 is not None:
+            data = await self.s3.get_bytes(self.bucket_name, self.key)
+        else:
+            data = await asyncio.to_thread(self._read)
+        if not data:
+            return []
+        try:
+            snapshots = json.loads(data)
+        except ValueError:
+            return []
+        oldest = time.time() - self.ttl
+        return [snapshot for snapshot in snapshots if snapshot.get("saved_at", 0) >= oldest]
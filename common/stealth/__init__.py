@@ -1 +1 @@
-from .stealth import stealth_async
+from .stealth import StealthConfig, register_profile, stealth_async, stealth_context_async, stealth_script
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Measure what each stealth evasion costs in page load time and JS heap.
+
+Every fixture page in ./fixtures is loaded in Chromium without stealth, with
+a config that enables no evasion, with a single evasion, with each named
+profile and with the default StealthConfig. The cost of an evasion is its
+median over the empty config, including the shared helpers (utils and
+generate_magic_arrays) it pulls in; the empty config, the profiles and the
+default config are compared to no stealth at all.
+
+Run with:
+    python -m common.stealth.benchmark --runs 10 --json stealth_benchmark.json
+"""
+import argparse
+import asyncio
+import dataclasses
+import json
+import os
+import statistics
+
+from playwright.async_api import async_playwright
+
+from .stealth import PROFILES, StealthConfig, stealth_context_async
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+METRICS = ("script_ms", "dcl_ms", "heap_kb")
+
+
+def evasions() -> list[str]:
+    """Return the names of the evasions that can be toggled in StealthConfig"""
+    return [field.name for field in dataclasses.fields(StealthConfig) if field.type is bool]
+
+
+def variants() -> dict:
+    """Return the configs to measure by name, None meaning no stealth at all"""
+    empty = StealthConfig(**{name: False for name in evasions()})
+    configs = {"none": None, "empty": empty, "default": StealthConfig()}
+    for name in PROFILES:
+        configs[f"profile:{name}"] = StealthConfig.from_profile(name)
+    for name in evasions():
+        configs[name] = dataclasses.replace(empty, **{name: True})
+    return configs
+
+
+async def measure(browser, url: str, config: StealthConfig = None) -> dict:
+    """Load a page in a fresh context and return its script time, DOMContentLoaded time and used heap"""
+    context = await browser.new_context()
+    try:
+        if config is not None:
+            await stealth_context_async(context, config)
+        page = await context.new_page()
+        cdp = await context.new_cdp_session(page)
+        await cdp.send("Performance.enable")
+        await page.goto(url, wait_until="load")
+        metrics = {m["name"]: m["value"] for m in (await cdp.send("Performance.getMetrics"))["metrics"]}
+        dcl = await page.evaluate(
+            "() => performance.getEntriesByType('navigation')[0].domContentLoadedEventEnd"
+        )
+        return {
+            "script_ms": metrics["ScriptDuration"] * 1000,
+            "dcl_ms": dcl,
+            "heap_kb": metrics["JSHeapUsedSize"] / 1024,
+        }
+    finally:
+        await context.close()
+
+
+async def run(runs: int = 5, fixtures: list[str] = None, headless: bool = True) -> dict:
+    """
+    Measure every variant on every fixture.
+
+    Args:
+        runs (int): The amount of page loads per variant and fixture, the median is kept.
+        fixtures (list[str]): The fixture file names to load, defaults to all of them.
+        headless (bool): Whether or not you want the browser to be headless.
+
+    Returns:
+        dict: fixture -> variant -> metric -> median value.
+    """
+    fixtures = fixtures or sorted(f for f in os.listdir(FIXTURES_DIR) if f.endswith(".html"))
+    configs = variants()
+    results = {}
+    async with async_playwright() as playwright:
+        browser = await playwright.chromium.launch(headless=headless)
+        try:
+            for fixture in fixtures:
+                url = f"file://{os.path.join(FIXTURES_DIR, fixture)}"
+                # warm up the browser caches so the first variant isn't penalised
+                await measure(browser, url)
+                results[fixture] = {}
+                for name, config in configs.items():
+                    samples = [await measure(browser, url, config) for _ in range(runs)]
+                    results[fixture][name] = {
+                        metric: statistics.median(sample[metric] for sample in samples) for metric in METRICS
+                    }
+        finally:
+            await browser.close()
+    return results
+
+
+def overhead(results: dict) -> dict:
+    """
+    Turn measurements into costs: profiles and default over no stealth, each evasion over the empty config.
+
+    Returns:
+        dict: fixture -> variant -> metric -> added value.
+    """
+    costs = {}
+    for fixture, measured in results.items():
+        costs[fixture] = {}
+        for name, metrics in measured.items():
+            if name == "none":
+                continue
+            compared_to_none = name in ("empty", "default") or name.startswith("profile:")
+            baseline = measured["none"] if compared_to_none else measured["empty"]
+            costs[fixture][name] = {metric: metrics[metric] - baseline[metric] for metric in METRICS}
+    return costs
+
+
+def report(costs: dict) -> str:
+    """Format costs as one table per fixture, most expensive evasion first"""
+    lines = []
+    for fixture, variant_costs in costs.items():
+        lines.append(f"\n{fixture}")
+        lines.append(f"{'variant':<28}{'+script ms':>12}{'+DCL ms':>12}{'+heap KB':>12}")
+        ordered = sorted(variant_costs.items(), key=lambda item: item[1]["script_ms"], reverse=True)
+        for name, cost in ordered:
+            lines.append(f"{name:<28}{cost['script_ms']:>12.2f}{cost['dcl_ms']:>12.2f}{cost['heap_kb']:>12.1f}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="page loads per variant and fixture")
+    parser.add_argument("--fixture", action="append", help="fixture file name, may be repeated")
+    parser.add_argument("--headful", action="store_true", help="show the browser")
+    parser.add_argument("--json", help="also write the raw medians and costs to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.runs, args.fixture, headless=not args.headful))
+    costs = overhead(results)
+    print(report(costs))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"medians": results, "overhead": costs}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
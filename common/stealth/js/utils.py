@@ -48,17 +48,17 @@ utils.stripProxyFromErrors = (handler = {}) => {
           ]
           return (
             err.stack
-              .split('\n')
+              .split('\\n')
               // Always remove the first (file) line in the stack (guaranteed to be our proxy)
               .filter((line, index) => index !== 1)
               // Check if the line starts with one of our blacklisted strings
               .filter(line => !blacklist.some(bl => line.trim().startsWith(bl)))
-              .join('\n')
+              .join('\\n')
           )
         }
 
         const stripWithAnchor = stack => {
-          const stackArr = stack.split('\n')
+          const stackArr = stack.split('\\n')
           const anchor = `at Object.newHandler.<computed> [as ${trap}] ` // Known first Proxy line in chromium
           const anchorIndex = stackArr.findIndex(line =>
             line.trim().startsWith(anchor)
@@ -69,7 +69,7 @@ utils.stripProxyFromErrors = (handler = {}) => {
           // Strip everything from the top until we reach the anchor line
           // Note: We're keeping the 1st line (zero index) as it's unrelated (e.g. `TypeError`)
           stackArr.splice(1, anchorIndex)
-          return stackArr.join('\n')
+          return stackArr.join('\\n')
         }
 
         // Try using the anchor method, fallback to blacklist if necessary
@@ -89,7 +89,7 @@ utils.stripProxyFromErrors = (handler = {}) => {
  * @param {string} anchor - The string the anchor line starts with
  */
 utils.stripErrorWithAnchor = (err, anchor) => {
-  const stackArr = err.stack.split('\n')
+  const stackArr = err.stack.split('\\n')
   const anchorIndex = stackArr.findIndex(line => line.trim().startsWith(anchor))
   if (anchorIndex === -1) {
     return err // 404, anchor not found
@@ -97,7 +97,7 @@ utils.stripErrorWithAnchor = (err, anchor) => {
   // Strip everything from the top until we reach the anchor line (remove anchor line as well)
   // Note: We're keeping the 1st line (zero index) as it's unrelated (e.g. `TypeError`)
   stackArr.splice(1, anchorIndex)
-  err.stack = stackArr.join('\n')
+  err.stack = stackArr.join('\\n')
   return err
 }
 
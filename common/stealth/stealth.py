@@ -1,51 +1,115 @@
 # -*- coding: utf-8 -*-
+import functools
+import importlib
 import json
-from dataclasses import dataclass
-from typing import Tuple, Optional, Dict
-
-from playwright.async_api import Page as AsyncPage
-
-from .js.chrome_app import chrome_app
-from .js.chrome_csi import chrome_csi
-from .js.chrome_hairline import chrome_hairline
-from .js.chrome_load_times import chrome_load_times
-from .js.chrome_runtime import chrome_runtime
-from .js.generate_magic_arrays import generate_magic_arrays
-from .js.iframe_contentWindow import iframe_contentWindow
-from .js.media_codecs import media_codecs
-from .js.navigator_hardwareConcurrency import navigator_hardwareConcurrency
-from .js.navigator_languages import navigator_languages
-from .js.navigator_permissions import navigator_permissions
-from .js.navigator_platform import navigator_platform
-from .js.navigator_plugins import navigator_plugins
-from .js.navigator_userAgent import navigator_userAgent
-from .js.navigator_vendor import navigator_vendor
-from .js.webgl_vendor import webgl_vendor
-from .js.window_outerdimensions import window_outerdimensions
-from .js.utils import utils
-
-SCRIPTS: Dict[str, str] = {
-    "chrome_csi": chrome_csi,
-    "chrome_app": chrome_app,
-    "chrome_runtime": chrome_runtime,
-    "chrome_load_times": chrome_load_times,
-    "chrome_hairline": chrome_hairline,
-    "generate_magic_arrays": generate_magic_arrays,
-    "iframe_content_window": iframe_contentWindow,
-    "media_codecs": media_codecs,
-    "navigator_vendor": navigator_vendor,
-    "navigator_plugins": navigator_plugins,
-    "navigator_permissions": navigator_permissions,
-    "navigator_languages": navigator_languages,
-    "navigator_platform": navigator_platform,
-    "navigator_user_agent": navigator_userAgent,
-    "navigator_hardware_concurrency": navigator_hardwareConcurrency,
-    "outerdimensions": window_outerdimensions,
-    "utils": utils,
+from dataclasses import astuple, dataclass, replace
+from typing import TYPE_CHECKING, Tuple, Optional, Dict, Union
+
+if TYPE_CHECKING:
+    from playwright.async_api import BrowserContext as AsyncBrowserContext, Page as AsyncPage
+
+# script name -> (module in ./js, variable holding the script), imported on first use
+SCRIPT_MODULES: Dict[str, Tuple[str, str]] = {
+    "chrome_csi": ("chrome_csi", "chrome_csi"),
+    "chrome_app": ("chrome_app", "chrome_app"),
+    "chrome_runtime": ("chrome_runtime", "chrome_runtime"),
+    "chrome_load_times": ("chrome_load_times", "chrome_load_times"),
+    "chrome_hairline": ("chrome_hairline", "chrome_hairline"),
+    "generate_magic_arrays": ("generate_magic_arrays", "generate_magic_arrays"),
+    "iframe_content_window": ("iframe_contentWindow", "iframe_contentWindow"),
+    "media_codecs": ("media_codecs", "media_codecs"),
+    "navigator_vendor": ("navigator_vendor", "navigator_vendor"),
+    "navigator_plugins": ("navigator_plugins", "navigator_plugins"),
+    "navigator_permissions": ("navigator_permissions", "navigator_permissions"),
+    "navigator_languages": ("navigator_languages", "navigator_languages"),
+    "navigator_platform": ("navigator_platform", "navigator_platform"),
+    "navigator_user_agent": ("navigator_userAgent", "navigator_userAgent"),
+    "navigator_hardware_concurrency": ("navigator_hardwareConcurrency", "navigator_hardwareConcurrency"),
+    "outerdimensions": ("window_outerdimensions", "window_outerdimensions"),
+    "utils": ("utils", "utils"),
+    "webgl_vendor": ("webgl_vendor", "webgl_vendor"),
+}
+INLINE_SCRIPTS: Dict[str, str] = {
     "webdriver": "delete Object.getPrototypeOf(navigator).webdriver",
-    "webgl_vendor": webgl_vendor,
 }
 
+# StealthConfig toggle -> script, in the order the scripts are injected
+EVASIONS: Tuple[Tuple[str, str], ...] = (
+    ("chrome_app", "chrome_app"),
+    ("chrome_csi", "chrome_csi"),
+    ("hairline", "chrome_hairline"),
+    ("chrome_load_times", "chrome_load_times"),
+    ("chrome_runtime", "chrome_runtime"),
+    ("iframe_content_window", "iframe_content_window"),
+    ("media_codecs", "media_codecs"),
+    ("navigator_languages", "navigator_languages"),
+    ("navigator_permissions", "navigator_permissions"),
+    ("navigator_platform", "navigator_platform"),
+    ("navigator_plugins", "navigator_plugins"),
+    ("navigator_user_agent", "navigator_user_agent"),
+    ("navigator_vendor", "navigator_vendor"),
+    ("webdriver", "webdriver"),
+    ("outerdimensions", "outerdimensions"),
+    ("webgl_vendor", "webgl_vendor"),
+)
+# scripts calling the helpers defined by utils, and by generate_magic_arrays
+NEEDS_UTILS = {
+    "chrome_app",
+    "chrome_csi",
+    "chrome_load_times",
+    "chrome_runtime",
+    "iframe_content_window",
+    "media_codecs",
+    "navigator_permissions",
+    "navigator_plugins",
+    "webgl_vendor",
+}
+NEEDS_MAGIC_ARRAYS = {"navigator_plugins"}
+
+# profile name -> enabled evasions, every other evasion is disabled
+PROFILES: Dict[str, set] = {
+    # headless giveaways that are free to patch
+    "minimal": {"webdriver", "navigator_user_agent", "outerdimensions", "hairline"},
+    # everything but the heavy proxies of iframe_content_window, media_codecs and navigator_plugins
+    "standard": {
+        "webdriver",
+        "navigator_user_agent",
+        "outerdimensions",
+        "hairline",
+        "chrome_app",
+        "chrome_csi",
+        "chrome_load_times",
+        "chrome_runtime",
+        "navigator_permissions",
+        "navigator_platform",
+        "navigator_vendor",
+        "webgl_vendor",
+    },
+    "full": {toggle for toggle, _ in EVASIONS},
+}
+
+
+@functools.lru_cache(maxsize=None)
+def load_script(name: str) -> str:
+    """Return a script by name, importing its module from ./js the first time"""
+    if name in INLINE_SCRIPTS:
+        return INLINE_SCRIPTS[name]
+    module, variable = SCRIPT_MODULES[name]
+    return getattr(importlib.import_module(f".js.{module}", __package__), variable)
+
+
+def register_profile(name: str, base: str = "standard", **toggles: bool):
+    """
+    Add a profile, e.g. for a site that needs one more evasion than its base profile.
+
+    Example:
+        register_profile("tiktok", base="standard", navigator_plugins=True)
+    """
+    enabled = set(PROFILES[base])
+    for toggle, on in toggles.items():
+        (enabled.add if on else enabled.discard)(toggle)
+    PROFILES[name] = enabled
+
 
 @dataclass
 class StealthConfig:
@@ -64,6 +128,8 @@ class StealthConfig:
             yield from super().enabled_scripts()
             yield 'console.log("last script")'
         ```
+        Named profiles (minimal, standard, full, or added with register_profile) are created with
+        `StealthConfig.from_profile`. Scripts are only imported once a config enables them.
     """
 
     # load script options
@@ -94,8 +160,23 @@ class StealthConfig:
     languages: Tuple[str] = ("en-US", "en")
     runOnInsecureOrigins: Optional[bool] = None
 
+    @classmethod
+    def from_profile(cls, name: str, **overrides):
+        """
+        Create a config from a named profile, see PROFILES.
+
+        Args:
+            name (str): minimal, standard, full or a profile added with register_profile.
+            **overrides: Fields to change on top of the profile, toggles or options.
+        """
+        if name not in PROFILES:
+            raise ValueError(f"Invalid stealth profile {name}, expected one of {tuple(PROFILES)}")
+        toggles = {toggle: toggle in PROFILES[name] for toggle, _ in EVASIONS}
+        return replace(cls(**toggles), **overrides)
+
     @property
     def enabled_scripts(self):
+        enabled = [script for toggle, script in EVASIONS if getattr(self, toggle)]
         opts = json.dumps(
             {
                 "webgl_vendor": self.vendor,
@@ -109,45 +190,45 @@ class StealthConfig:
         )
         # defined options constant
         yield f"const opts = {opts}"
-        # init utils and generate_magic_arrays helper
-        yield SCRIPTS["utils"]
-        yield SCRIPTS["generate_magic_arrays"]
-
-        if self.chrome_app:
-            yield SCRIPTS["chrome_app"]
-        if self.chrome_csi:
-            yield SCRIPTS["chrome_csi"]
-        if self.hairline:
-            yield SCRIPTS["chrome_hairline"]
-        if self.chrome_load_times:
-            yield SCRIPTS["chrome_load_times"]
-        if self.chrome_runtime:
-            yield SCRIPTS["chrome_runtime"]
-        if self.iframe_content_window:
-            yield SCRIPTS["iframe_content_window"]
-        if self.media_codecs:
-            yield SCRIPTS["media_codecs"]
-        if self.navigator_languages:
-            yield SCRIPTS["navigator_languages"]
-        if self.navigator_permissions:
-            yield SCRIPTS["navigator_permissions"]
-        if self.navigator_platform:
-            yield SCRIPTS["navigator_platform"]
-        if self.navigator_plugins:
-            yield SCRIPTS["navigator_plugins"]
-        if self.navigator_user_agent:
-            yield SCRIPTS["navigator_user_agent"]
-        if self.navigator_vendor:
-            yield SCRIPTS["navigator_vendor"]
-        if self.webdriver:
-            yield SCRIPTS["webdriver"]
-        if self.outerdimensions:
-            yield SCRIPTS["outerdimensions"]
-        if self.webgl_vendor:
-            yield SCRIPTS["webgl_vendor"]
-
-
-async def stealth_async(page: AsyncPage, config: StealthConfig = None):
+        # init utils and generate_magic_arrays helper, only when an enabled script calls them
+        if NEEDS_UTILS.intersection(enabled):
+            yield load_script("utils")
+        if NEEDS_MAGIC_ARRAYS.intersection(enabled):
+            yield load_script("generate_magic_arrays")
+
+        # a block per evasion: one throwing, e.g. on a read-only property, doesn't stop the others,
+        # and its top-level consts don't clash with another script's
+        for script in enabled:
+            yield f"try {{\n{load_script(script)}\n}} catch (e) {{}}"
+
+
+# compiled bundles by config, see stealth_script
+BUNDLES: Dict[tuple, str] = {}
+
+
+def minify(script: str) -> str:
+    """Conservatively shrink a script: strip indentation and drop blank and comment-only lines"""
+    lines = (line.strip() for line in script.splitlines())
+    return "\n".join(line for line in lines if line and not line.startswith("//"))
+
+
+def stealth_script(config: Union[StealthConfig, str] = None) -> str:
+    """Return the enabled scripts of a config or profile as one minified script, built once per distinct config"""
+    if isinstance(config, str):
+        config = StealthConfig.from_profile(config)
+    config = config or StealthConfig()
+    key = (type(config), astuple(config))
+    if key not in BUNDLES:
+        # scripts don't all end with a semicolon, so separate them explicitly
+        BUNDLES[key] = ";\n".join(minify(script) for script in config.enabled_scripts)
+    return BUNDLES[key]
+
+
+async def stealth_async(page: "AsyncPage", config: Union[StealthConfig, str] = None):
     """stealth the page"""
-    for script in (config or StealthConfig()).enabled_scripts:
-        await page.add_init_script(script)
+    await page.add_init_script(stealth_script(config))
+
+
+async def stealth_context_async(context: "AsyncBrowserContext", config: Union[StealthConfig, str] = None):
+    """stealth every page of the context, including pages opened later"""
+    await context.add_init_script(stealth_script(config))
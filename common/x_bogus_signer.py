@@ -0,0 +1,113 @@
+import collections
+import random
+import time
+import weakref
+
+from playwright.async_api import Error, TimeoutError
+
+SIGNER_READY = "window.byted_acrawler !== undefined"
+SIGN_BATCH = "(urls) => urls.map(url => window.byted_acrawler.frontierSign(url))"
+TRY_URLS = ["https://www.tiktok.com/foryou", "https://www.tiktok.com", "https://www.tiktok.com/@tiktok", "https://www.tiktok.com/foryou"]
+
+
+class XBogusSigner:
+    """
+    Signs urls with the page's `window.byted_acrawler.frontierSign`.
+
+    Readiness of the signer is checked once per page instead of on every call,
+    signatures are kept in an LRU with a TTL keyed by user agent and url, and
+    all urls missing from the cache are signed with a single `evaluate`.
+    """
+
+    def __init__(self, cache_size: int = 4096, ttl: float = 60.0, max_attempts: int = 5):
+        """
+        Create a XBogusSigner.
+
+        Args:
+            cache_size (int): The maximum number of cached signatures.
+            ttl (float): The amount of seconds a signature is reused for.
+            max_attempts (int): The amount of page loads to try before giving up on the signer.
+        """
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.hits = 0
+        self.misses = 0
+        self._cache = collections.OrderedDict()  # (user agent, url) -> (expires at, signature)
+        self._ready_pages = weakref.WeakSet()
+
+    async def ensure_ready(self, page):
+        """Wait until the signer script is loaded in the page, reloading tiktok if it is not"""
+        if page in self._ready_pages:
+            return
+        attempts = 0
+        while attempts < self.max_attempts:
+            attempts += 1
+            try:
+                timeout_time = random.randint(5000, 20000)
+                await page.wait_for_function(SIGNER_READY, timeout=timeout_time)
+                break
+            except TimeoutError:
+                if attempts == self.max_attempts:
+                    raise TimeoutError(f"Failed to load tiktok after {self.max_attempts} attempts, consider using a proxy")
+                await page.goto(random.choice(TRY_URLS))
+        self._ready_pages.add(page)
+
+    def _cached(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, signature = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return signature
+
+    def _store(self, key, signature):
+        self._cache[key] = (time.monotonic() + self.ttl, signature)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def sign_many(self, session, urls: list) -> list:
+        """
+        Sign urls with a session's page.
+
+        Args:
+            session (PlaywrightSession): The session whose page signs the urls.
+            urls (list[str]): The urls to sign.
+
+        Returns:
+            list[dict]: The signature of every url, e.g. {"X-Bogus": "..."}.
+        """
+        user_agent = (session.params or {}).get("browser_version")
+        signatures = {}
+        missing = []
+        for url in dict.fromkeys(urls):
+            signature = self._cached((user_agent, url))
+            if signature is None:
+                missing.append(url)
+            else:
+                signatures[url] = signature
+        self.hits += len(urls) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            await self.ensure_ready(session.page)
+            try:
+                signed = await session.page.evaluate(SIGN_BATCH, missing)
+            except Error:
+                # The page navigated away and lost the signer, load it again once
+                self._ready_pages.discard(session.page)
+                await self.ensure_ready(session.page)
+                signed = await session.page.evaluate(SIGN_BATCH, missing)
+            for url, signature in zip(missing, signed):
+                self._store((user_agent, url), signature)
+                signatures[url] = signature
+
+        return [signatures[url] for url in urls]
+
+    async def sign(self, session, url: str) -> dict:
+        """Sign a single url, see sign_many"""
+        return (await self.sign_many(session, [url]))[0]
@@ -1,56 +1,79 @@
 import asyncio
-
-from crawlee.crawlers import BeautifulSoupCrawler, BeautifulSoupCrawlingContext
-from common.db_helper import DatabaseHelper
-from common.s3_helper import S3Helper
-from common.network_helper import NetworkHelper
+import time
+from contextlib import AsyncExitStack
+
+from crawlee.crawlers import BasicCrawlingContext, BeautifulSoupCrawler, BeautifulSoupCrawlingContext
+from common.db_helper import AsyncDatabaseHelper, WriteBehindBuffer
+from common.link_index import LinkIndex
+from common.page_archive import PageArchive
+from common.s3_helper import AsyncS3Helper
+from common.proxy_pool import ProxyPool
 from config.config import config
 from crawlee._request import Request, RequestOptions
 from crawlee.proxy_configuration import ProxyConfiguration
 
-s3 = S3Helper()
-network_helper = NetworkHelper()
-db_helper = DatabaseHelper(
+s3 = AsyncS3Helper()
+archive = PageArchive(s3)
+proxy_pool = ProxyPool(health_check_url="https://masothue.com")
+db_helper = AsyncDatabaseHelper(
     host=config.MARIADB_HOST,
     port=config.MARIADB_PORT,
     user=config.MARIADB_USER,
     password=config.MARIADB_PASS,
     database="mydatabase"
 )
+link_index = LinkIndex(db_helper)
+navigation_started = {}  # request id -> time.monotonic() before its navigation
+write_buffer = WriteBehindBuffer(db_helper.db)
 
-def insert_links(table: str, links: list):
+async def insert_links(table: str, links: list):
     """
-    Insert links into the specified table with flag=False.
-    Ignores duplicates.
+    Queue links for insertion into the specified table with flag=False.
+    Ignores duplicates. Keeps the link index in sync.
     """
     if not links:
         return
-    sql = f"""
-        INSERT INTO {table} (link, flag) VALUES (%s, False)
-        ON DUPLICATE KEY UPDATE id = id
+    write_buffer.insert_links(table, links)
+    await link_index.add(table, links)
+
+async def update_flag(table: str, link: str):
+    """
+    Queue flag=True for the given link in the specified table.
     """
-    values = [(link,) for link in links]
-    db_helper.executemany(sql, values)
+    write_buffer.update_flag(table, link)
+    await link_index.mark_flag(table, link)
 
-def update_flag(table: str, link: str):
+async def start_timer(context: BasicCrawlingContext):
+    navigation_started[context.request.id] = time.monotonic()
+
+def report_proxy(context: BasicCrawlingContext, failed: bool = False):
     """
-    Set flag=True for the given link in the specified table.
+    Report how the request went through its proxy, so the pool can score the proxy and reset its failure streak.
     """
-    sql = f"""
-        UPDATE {table}
-        SET flag = True
-        WHERE link = '{link}'
+    started = navigation_started.pop(context.request.id, None)
+    if context.proxy_info is not None:
+        latency = None if failed or started is None else time.monotonic() - started
+        proxy_pool.report(context.proxy_info.url, latency, failed=failed)
+
+async def archive_page(context: BeautifulSoupCrawlingContext):
     """
-    db_helper.execute(sql)
+    Archive the raw body of the page, after its links were handled so an archive failure can't abort the page.
+    """
+    try:
+        await archive.store(context.request.url, context.http_response.read())
+    except Exception as e:
+        context.log.error(f"❌ Không lưu được trang {context.request.url}: {e}")
 
 async def failed_request_handler(context: BeautifulSoupCrawlingContext, error):
     status_code = getattr(error, "status_code", None)
     context.log.warning(f"⚠️ Request lỗi ({status_code}), đổi proxy...")
 
     try:
-        # Lấy proxy mới
-        host, port, user, password = network_helper.get_proxy()
-        context.proxy_info.url = [f"http://{user}:{password}@{host}:{port}/"]                                                   
+        # Bỏ proxy bị chặn, request sau sẽ lấy proxy khác trong pool
+        if context.proxy_info is not None:
+            report_proxy(context, failed=True)
+            if status_code in (403, 429):
+                proxy_pool.drop(context.proxy_info.url)
 
         # Delay tránh bị chặn tiếp
         await asyncio.sleep(5)
@@ -64,24 +87,19 @@ async def failed_request_handler(context: BeautifulSoupCrawlingContext, error):
         context.log.error(f"❌ Không đổi proxy được: {e}")
 
 async def main() -> None:
-    host, port, user, password = network_helper.get_proxy()
-    proxy_configuration = ProxyConfiguration(
-        proxy_urls=[
-            f"http://{user}:{password}@{host}:{port}/"
-        ],
-    )
+    await proxy_pool.start()
+    proxy_configuration = ProxyConfiguration(new_url_function=proxy_pool.new_url)
     crawler = BeautifulSoupCrawler(
         max_requests_per_crawl=10000,
         proxy_configuration=proxy_configuration
     )
-    
-    host, port, user, password = network_helper.get_proxy()
-    crawler._proxy_configuration._proxy_urls = f"http://{user}:{password}@{host}:{port}/"
     crawler.failed_request_handler(handler=failed_request_handler)
+    crawler.pre_navigation_hook(start_timer)
 
     # Handler mặc định -> lấy link province
     @crawler.router.default_handler
     async def request_handler(context: BeautifulSoupCrawlingContext) -> None:
+        report_proxy(context)
         await asyncio.sleep(2)
         context.log.info(f'Processing {context.request.url} ...')
         # Get link from navigation pane
@@ -90,25 +108,26 @@ async def main() -> None:
             "https://masothue.com" + a.get("href")
             for a in soup.select("#sidebar > aside.widget.widget_categories.container > ul > li > a")
         ]
-        links_exist = [row[0] for row in db_helper.execute(f"SELECT link FROM province")]
-        links_new = [link for link in links if link not in links_exist]
+        links_new = await link_index.filter_new("province", links)
         if links_new:
-            insert_links(table="province", links=links)
+            await insert_links(table="province", links=links_new)
             context.log.info(f"✅ Inserted {len(links_new)} province links")
 
         # enqueue links tới province handler
-        all_link = list(set(links_exist + links_new))
+        all_link = await link_index.links("province")
         requests = []
         for link in all_link:
             request_options = RequestOptions(url=link, label="province")
             request = Request.from_url(**request_options)
             requests.append(request)
         await context.enqueue_links(requests=requests)
+        await archive_page(context)
         
 
     # Handler cho province -> lấy district
     @crawler.router.handler("province")
     async def province_handler(context: BeautifulSoupCrawlingContext) -> None:
+        report_proxy(context)
         await asyncio.sleep(2)
         context.log.info(f'Processing province: {context.request.url}')
         # # Check đã crawl chưa [TODO: flag = False THEN crawl]
@@ -119,24 +138,25 @@ async def main() -> None:
             "https://masothue.com" + a.get("href")
             for a in soup.select("#sidebar > aside.widget.widget_categories.container > ul > li > a")
         ]
-        links_exist = [row[0] for row in db_helper.execute(f"SELECT link FROM district")]
-        links_new = [link for link in links if link not in links_exist]
+        links_new = await link_index.filter_new("district", links)
         if links_new:
-            insert_links(table="district", links=links)
+            await insert_links(table="district", links=links_new)
             context.log.info(f"✅ Inserted {len(links_new)} district links")
         
         # enqueue links tới province handler
-        all_link = [row[0] for row in db_helper.execute(f"SELECT link FROM district WHERE flag = False")]
+        all_link = await link_index.links("district", flag=False)
         requests = []
         for link in all_link:
             request_options = RequestOptions(url=link, label="district")
             request = Request.from_url(**request_options)
             requests.append(request)
         await context.enqueue_links(requests=requests)
+        await archive_page(context)
         
 
     @crawler.router.handler("district")
     async def district_handler(context: BeautifulSoupCrawlingContext) -> None:
+        report_proxy(context)
         await asyncio.sleep(2)
         context.log.info(f'Processing district: {context.request.url}')
         
@@ -145,12 +165,12 @@ async def main() -> None:
             "https://masothue.com" + a.get("href")
             for a in soup.select("#sidebar > aside.widget.widget_categories.container > ul > li > a")
         ]
-        links_exist = [row[0] for row in db_helper.execute(f"SELECT link FROM ward")]
-        links_new = [link for link in links if link not in links_exist]
+        links_new = await link_index.filter_new("ward", links)
         if links_new:
-            insert_links(table="ward", links=links)
-            update_flag(table="district", link=context.request.url)
+            await insert_links(table="ward", links=links_new)
+            await update_flag(table="district", link=context.request.url)
             context.log.info(f"✅ Inserted {len(links_new)} ward links")
+        await archive_page(context)
         
         # enqueue links tới province handler
         # all_link = list(set(links_exist + links_new))
@@ -162,7 +182,14 @@ async def main() -> None:
         # await context.enqueue_links(requests=requests)
 
     # Chạy crawler sau khi đã khai báo đủ handler
-    await crawler.run(['https://masothue.com'])
+    # Close everything even if one of the closes fails, callbacks run in reverse order
+    async with AsyncExitStack() as stack:
+        stack.push_async_callback(proxy_pool.close)
+        stack.push_async_callback(s3.close)
+        stack.push_async_callback(archive.close)
+        stack.callback(db_helper.close)
+        stack.callback(write_buffer.close)
+        await crawler.run(['https://masothue.com'])
 
 if __name__ == '__main__':
     asyncio.run(main())
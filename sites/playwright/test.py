@@ -1,25 +1,25 @@
 import asyncio
-import random
 
 from config.config import config
 from requests.adapters import HTTPAdapter, Retry
 from bs4 import BeautifulSoup
 from common.playwright_helper import PlaywrightHelper
 from common.s3_helper import S3Helper
-from common.db_helper import DatabaseHelper
+from common.db_helper import AsyncDatabaseHelper, DatabaseHelper, WriteBehindBuffer
 from typing import List
 
 BASE_URL = "https://masothue.com/"
 MAX_WORKERS = 10
 MAX_RETRY_SECONDS = 180
 s3 = S3Helper()
-db_helper = DatabaseHelper(
+db_helper = AsyncDatabaseHelper(
     host=config.MARIADB_HOST,
     port=config.MARIADB_PORT,
     user=config.MARIADB_USER,
     password=config.MARIADB_PASS,
     database="mydatabase"
 )
+write_buffer = WriteBehindBuffer(db_helper.db)
 
 headers = {
     'accept': '*/*',
@@ -56,74 +56,65 @@ async def get_links_province(api: PlaywrightHelper, session_index = 0):
     html = await api.make_request(url=BASE_URL, headers=headers, session_index=session_index)
     soup = BeautifulSoup(html, "html.parser")
     links = ["https://masothue.com" + a.get("href") for a in soup.select("#sidebar > aside.widget.widget_categories.container > ul > li > a")]
-    for link in links:
-        db_helper.execute(
-            f"""
-            INSERT INTO province (link) VALUES ('{link}')
-            ON DUPLICATE KEY UPDATE
-            link = VALUES(link)
-            """
-        )
+    write_buffer.insert_links("province", links)
+    await asyncio.to_thread(write_buffer.flush)
     print("✅ Got", len(links), "province links")
     return links
 
 async def get_links_district(api: PlaywrightHelper, links_province: List[str], session_index = 0):
     print("✅ Processing", len(links_province))
-    links_province = db_helper.execute("SELECT DISTINCT * FROM province WHERE flag = 0")
+    links_province = await db_helper.execute("SELECT DISTINCT * FROM province WHERE flag = 0")
     link_list = []
     for link_province in links_province:
         html = await api.make_request(url=link_province[0], headers=headers, session_index=session_index)
         _, session = api._get_session(session_index=session_index)
         soup = BeautifulSoup(html, "html.parser")
         links = ["https://masothue.com" + a.get("href") for a in soup.select("#sidebar > aside.widget.widget_categories.container > ul > li > a")]
-        for link in links:
-            db_helper.execute(
-                f"""
-                INSERT INTO district (link) VALUES ('{link}')
-                ON DUPLICATE KEY UPDATE
-                link = VALUES(link)
-                """
-            )
+        write_buffer.insert_links("district", links)
         link_list.extend(links)
         # Wait
         await session.page.wait_for_timeout(10000)
     
+    await asyncio.to_thread(write_buffer.flush)
     return link_list
 
-async def get_links_ward(api: PlaywrightHelper, session_index_list=None):
+async def get_links_ward(api: PlaywrightHelper, concurrency: int = 2):
     link_list = []
-    links_district = db_helper.execute("SELECT DISTINCT * FROM district WHERE link > 'https://masothue.com/tra-cuu-ma-so-thue-theo-tinh/thi-xa-tu-son-331'")
+    links_district = await db_helper.execute(
+        "SELECT DISTINCT * FROM district WHERE link > %s",
+        ("https://masothue.com/tra-cuu-ma-so-thue-theo-tinh/thi-xa-tu-son-331",),
+    )
+    queue = asyncio.Queue()
     for link_district in links_district:
-        if session_index_list is not None:
-            session_index = random.choice(session_index_list)
-        else:
-            session_index = 0
+        queue.put_nowait(link_district[0])
 
-        html = await api.make_request(url=link_district[0], headers=headers, session_index=session_index)
-        _, session = api._get_session(session_index=session_index)
+    async def worker():
+        # The session pool hands each request the least loaded session
+        while not queue.empty():
+            link_district = queue.get_nowait()
+            html = await api.make_request(url=link_district, headers=headers)
 
-        soup = BeautifulSoup(html, "html.parser")
-        if soup.select_one("#sidebar > aside.widget.widget_categories.container > ul > li > a"):
-            links = ["https://masothue.com" + a.get("href") for a in soup.select("#sidebar > aside.widget.widget_categories.container > ul > li > a")]
-            for link in links:
-                db_helper.execute(
-                    f"""
-                    INSERT INTO ward (link) VALUES ('{link}')
-                    ON DUPLICATE KEY UPDATE
-                    link = VALUES(link)
-                    """
-                )
-            link_list.extend(links)
-        # Wait
-        await session.page.wait_for_timeout(1000)
+            soup = BeautifulSoup(html, "html.parser")
+            if soup.select_one("#sidebar > aside.widget.widget_categories.container > ul > li > a"):
+                links = ["https://masothue.com" + a.get("href") for a in soup.select("#sidebar > aside.widget.widget_categories.container > ul > li > a")]
+                write_buffer.insert_links("ward", links)
+                link_list.extend(links)
+            # Wait
+            await asyncio.sleep(1)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
     return link_list
 
 async def search_users():
-    async with PlaywrightHelper() as api:
-        await api.create_sessions(num_sessions=3, browser="chromium", starting_url=BASE_URL, headless=True)
-        await get_links_province(api=api, session_index=0)
-        await get_links_district(api=api, session_index=0)
-        await get_links_ward(api=api, session_index_list=[1,2])
+    try:
+        async with PlaywrightHelper() as api:
+            await api.create_sessions(num_sessions=3, browser="chromium", starting_url=BASE_URL, headless=True)
+            links_province = await get_links_province(api=api, session_index=0)
+            await get_links_district(api=api, links_province=links_province, session_index=0)
+            await get_links_ward(api=api, concurrency=3)
+    finally:
+        # Flush the pending links even if the crawl failed
+        write_buffer.close()
         
 
 if __name__ == "__main__":